@@ -1,3 +1,5 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -6,6 +8,9 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import os
 from dotenv import load_dotenv
+from app.cache import LRUTTLCache
+from app.executors import password_executor
+from app.services.token_service import TokenService
 
 load_dotenv()
 
@@ -16,13 +21,32 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Token digest -> decoded claims of recently seen access tokens
+token_cache = LRUTTLCache(
+    maxsize=int(os.getenv("JWT_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("JWT_CACHE_TTL_SECONDS", "300"))
+)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, role: Optional[str] = None):
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() in the bounded password pool, off the event loop."""
+    return await password_executor.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash() in the bounded password pool, off the event loop."""
+    return await password_executor.run(get_password_hash, password)
+
+def create_access_token(
+    data: dict,
+    expires_delta: Optional[timedelta] = None,
+    role: Optional[str] = None,
+    token_version: int = 0
+):
     """
     Create JWT access token with role claim for role-based access control.
     
@@ -30,6 +54,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, r
         data: Token payload data (must include 'sub' for email)
         expires_delta: Optional custom expiration time
         role: User role (admin/student) to include in token claims
+        token_version: User's current token version; the token is rejected
+            once the user's tokens are revoked (see TokenService)
     
     Returns:
         Encoded JWT token string
@@ -39,53 +65,98 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, r
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "ver": token_version})
     if role:
         to_encode.update({"role": role})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    """
+    Dependency decoding the bearer token into its verified claims.
+    Decoded claims are cached by token digest, so repeat requests with the
+    same token skip signature verification. Rejects tokens revoked since
+    they were issued.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+    cache_key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(cache_key)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("sub")
+            if email is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
+        # Never serve a cached token past its own expiry
+        if "exp" in payload:
+            token_cache.set(cache_key, payload, ttl=min(token_cache.ttl, payload["exp"] - time.time()))
+        else:
+            token_cache.set(cache_key, payload)
+    # Revocation is checked on every request, cached or not
+    if TokenService.is_revoked(payload["sub"], payload.get("ver", 0)):
         raise credentials_exception
-    return email
+    return payload
+
+async def get_current_user(payload: dict = Depends(get_token_payload)):
+    return payload["sub"]
 
-async def get_current_admin(current_user: str = Depends(get_current_user)):
+# Never load the password hash into request handlers
+USER_PROJECTION = {"password": 0}
+
+async def get_current_user_doc(current_user: str = Depends(get_current_user)) -> dict:
     """
-    Dependency to ensure current user is an admin.
-    Strictly enforces admin-only access to protected routes.
+    Dependency resolving the authenticated user's document (without the password hash).
+    FastAPI caches dependencies per request, so all handler dependencies on it
+    share a single users lookup.
     """
     from app.database import get_database
     db = get_database()
-    user = await db.users.find_one({"email": current_user})
-    if not user or user.get("role") != "admin":
+    user = await db.users.find_one({"email": current_user}, USER_PROJECTION)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+async def get_token_role(payload: dict) -> Optional[str]:
+    """
+    Role from the signed token claim. Tokens issued before the claim existed
+    fall back to the users collection.
+    """
+    if "role" in payload:
+        return payload["role"]
+    user = await get_current_user_doc(payload["sub"])
+    return user.get("role")
+
+async def get_current_admin(payload: dict = Depends(get_token_payload)):
+    """
+    Dependency to ensure current user is an admin.
+    Strictly enforces admin-only access to protected routes.
+    Authorizes from the token's role claim without a database round-trip.
+    """
+    if await get_token_role(payload) != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required. This endpoint is restricted to administrators only."
         )
-    return current_user
+    return payload["sub"]
 
-async def get_current_student(current_user: str = Depends(get_current_user)):
+async def get_current_student(payload: dict = Depends(get_token_payload)):
     """
     Dependency to ensure current user is a student.
     Used for student-only routes.
     """
-    from app.database import get_database
-    db = get_database()
-    user = await db.users.find_one({"email": current_user})
-    if not user or user.get("role") != "student":
+    if await get_token_role(payload) != "student":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Student access required."
         )
-    return current_user
+    return payload["sub"]
@@ -1,18 +1,114 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pymongo.errors import ConnectionFailure
-import os
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from typing import Literal, Optional
+from app.db_monitoring import CommandMetrics, ConnectionPoolMetrics
+import asyncio
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+class DatabaseSettings(BaseSettings):
+    """
+    Motor client settings, read from MONGO_* environment variables
+    (e.g. MONGO_MAX_POOL_SIZE). Options given here take precedence over the
+    same options in MONGODB_URI.
+    """
+    model_config = SettingsConfigDict(env_prefix="MONGO_", extra="ignore")
+
+    uri: str = Field("mongodb://localhost:27017/hostelfix", validation_alias="MONGODB_URI")
+    app_name: str = "hostelfix-api"
+    # Connections per API worker; size to expected concurrent requests per worker
+    max_pool_size: int = Field(100, ge=1)
+    # Connections kept open (and opened at startup) so first requests skip connection setup
+    min_pool_size: int = Field(10, ge=0)
+    max_idle_time_ms: Optional[int] = None
+    # How long a request waits for a free pooled connection before failing
+    wait_queue_timeout_ms: Optional[int] = 10000
+    server_selection_timeout_ms: int = 10000
+    connect_timeout_ms: int = 10000
+    # None waits indefinitely for a server reply
+    socket_timeout_ms: Optional[int] = None
+    # Comma-separated wire compressors in order of preference: zstd, snappy, zlib
+    # (zstd needs the zstandard package, snappy python-snappy)
+    compressors: str = ""
+    zlib_compression_level: Optional[int] = Field(None, ge=-1, le=9)
+    # Connections opened during startup (defaults to min_pool_size)
+    prewarm_connections: Optional[int] = Field(None, ge=0)
+    # Where analytics reads (admin dashboards, reports) go, and how stale they may be
+    analytics_read_preference: Literal[
+        "primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"
+    ] = "secondaryPreferred"
+    # -1 for no bound; MongoDB requires at least 90 seconds otherwise
+    analytics_max_staleness_seconds: int = 120
+    analytics_read_concern: Literal["local", "available", "majority"] = "local"
+
+    @field_validator("analytics_max_staleness_seconds")
+    @classmethod
+    def check_max_staleness(cls, value: int) -> int:
+        if value != -1 and value < 90:
+            raise ValueError("must be -1 (no bound) or at least 90 seconds")
+        return value
+
+    def client_options(self) -> dict:
+        """Keyword options for AsyncIOMotorClient."""
+        options = {
+            "appname": self.app_name,
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+            "compressors": self.compressors or None,
+            "zlibCompressionLevel": self.zlib_compression_level
+        }
+        return {key: value for key, value in options.items() if value is not None}
+
+
+database_settings = DatabaseSettings()
+pool_metrics = ConnectionPoolMetrics(max_pool_size=database_settings.max_pool_size)
+command_metrics = CommandMetrics()
+
+READ_PREFERENCE_MODES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest
+}
+
+def analytics_read_preference():
+    mode = database_settings.analytics_read_preference
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCE_MODES[mode](max_staleness=database_settings.analytics_max_staleness_seconds)
+
+# use case -> (read preference, read concern)
+READ_USE_CASES = {
+    # Writes and reads that must see the caller's own writes
+    "primary": (Primary(), ReadConcern()),
+    # Dashboards, reports and exports: may lag the primary by the staleness bound,
+    # so heavy aggregations stay off the node serving writes
+    "analytics": (analytics_read_preference(), ReadConcern(database_settings.analytics_read_concern))
+}
+
 client: AsyncIOMotorClient = None
 database = None
 
 async def connect_to_mongo():
     global client, database
-    mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/hostelfix")
+    mongodb_uri = database_settings.uri
     try:
-        client = AsyncIOMotorClient(mongodb_uri)
+        client = AsyncIOMotorClient(
+            mongodb_uri,
+            event_listeners=[pool_metrics, command_metrics],
+            **database_settings.client_options()
+        )
         # Extract database name from URI or use default
         if "/" in mongodb_uri.split("?")[0]:
             db_name = mongodb_uri.split("/")[-1].split("?")[0]
@@ -24,11 +120,28 @@ async def connect_to_mongo():
             database = client.get_database("hostelfix")
         # Test connection
         await client.admin.command('ping')
-        print("✅ Connected to MongoDB")
+        prewarmed = await prewarm_connections()
+        print(f"✅ Connected to MongoDB ({prewarmed} pooled connections open)")
     except Exception as e:
         print(f"❌ Failed to connect to MongoDB: {e}")
         raise
 
+async def prewarm_connections() -> int:
+    """
+    Open pooled connections up front with concurrent pings (each holds its
+    own connection), so requests right after a deploy skip connection setup.
+
+    Returns:
+        Number of open connections
+    """
+    count = database_settings.prewarm_connections
+    if count is None:
+        count = database_settings.min_pool_size
+    count = min(count, database_settings.max_pool_size)
+    if count > 1:
+        await asyncio.gather(*[client.admin.command('ping') for _ in range(count)])
+    return pool_metrics.open_connections
+
 async def close_mongo_connection():
     global client
     if client:
@@ -37,3 +150,14 @@ async def close_mongo_connection():
 
 def get_database():
     return database
+
+def get_collection(name: str, use_case: str = "primary"):
+    """
+    Collection handle with the read preference and read concern of a use case
+    ("primary" or "analytics", see READ_USE_CASES). On a standalone server
+    every read goes to that server.
+    """
+    if use_case not in READ_USE_CASES:
+        raise ValueError(f"Unknown read use case: {use_case}")
+    read_preference, read_concern = READ_USE_CASES[use_case]
+    return database.get_collection(name, read_preference=read_preference, read_concern=read_concern)
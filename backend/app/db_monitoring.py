@@ -0,0 +1,122 @@
+"""
+MongoDB driver monitoring.
+Listeners registered on the Motor client that turn driver events into
+in-process metrics for /admin/metrics and Prometheus metrics for /metrics.
+"""
+import threading
+import time
+from collections import deque
+from pymongo import monitoring
+from app.metrics import record_command
+
+
+class ConnectionPoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Tracks connection checkout wait times and pool saturation.
+
+    A checkout's started and checked-out/failed events fire on the same
+    driver thread, so the wait is timed with a thread-local start time.
+    """
+
+    def __init__(self, max_pool_size: int, window: int = 1000):
+        self.max_pool_size = max_pool_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Most recent checkout waits (seconds) for percentiles
+        self._waits = deque(maxlen=window)
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.pool_clears = 0
+
+    # Pool lifecycle
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    # Connections
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    # Checkouts
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.total_wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            self._waits.append(wait)
+
+    def connection_check_out_failed(self, event):
+        # reason is "timeout", "poolClosed" or "connectionError"
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+
+            def percentile(p: float) -> float:
+                if not waits:
+                    return 0.0
+                return round(waits[min(len(waits) - 1, int(round(p / 100 * (len(waits) - 1))))] * 1000, 3)
+
+            return {
+                "max_pool_size": self.max_pool_size,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                # Share of the pool in use; near 1.0 means requests queue for connections
+                "saturation": round(self.checked_out / self.max_pool_size, 4) if self.max_pool_size else None,
+                "peak_saturation": round(self.max_checked_out / self.max_pool_size, 4) if self.max_pool_size else None,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "avg_wait_ms": round(self.total_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "p95_wait_ms": percentile(95),
+                "p99_wait_ms": percentile(99),
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "pool_clears": self.pool_clears
+            }
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records every MongoDB command's duration against the route that issued it."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record_command(event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record_command(event.command_name, event.duration_micros / 1e6, failed=True)
@@ -0,0 +1,129 @@
+"""
+Bounded worker pools for CPU-bound work.
+Keeps blocking jobs off the event loop, caps how many run at once and
+tracks how many are waiting for a slot.
+
+The pools are thread pools: ML jobs read and update the in-process
+duplicate index, and NumPy/SciPy and bcrypt release the GIL in their hot loops.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class BoundedExecutor:
+    """Runs blocking callables in a thread pool behind an asyncio semaphore."""
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int = 2,
+        max_concurrency: Optional[int] = None
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency or max_workers
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Metrics
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=f"{self.name}-worker"
+            )
+        return self._pool
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Run func in the pool, waiting for a free slot."""
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        started_at = time.perf_counter()
+        self.total_wait_seconds += started_at - queued_at
+        self.running += 1
+        try:
+            future = self.pool.submit(partial(func, *args, **kwargs))
+        except BaseException:
+            self._finished(started_at, None)
+            raise
+        # The slot is freed when the job itself finishes: a cancelled caller
+        # stops waiting, but its job keeps the worker thread until it returns
+        future.add_done_callback(partial(self._on_done, loop, started_at))
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, loop: asyncio.AbstractEventLoop, started_at: float, future: Future) -> None:
+        """Future callback (runs in the worker thread): account for the job on the loop."""
+        try:
+            loop.call_soon_threadsafe(self._finished, started_at, future)
+        except RuntimeError:
+            # Event loop already closed (shutdown); nothing is waiting for the slot
+            pass
+
+    def _finished(self, started_at: float, future: Optional[Future]) -> None:
+        """Account for a finished (or never started) job and free its slot."""
+        # Jobs cancelled before they started count as neither
+        if future is None:
+            self.failed += 1
+        elif not future.cancelled():
+            if future.exception() is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        self.running -= 1
+        self.total_run_seconds += time.perf_counter() - started_at
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queued,
+            "max_queue_depth": self.max_queue_depth,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait_seconds / finished * 1000, 3) if finished else 0.0,
+            "avg_run_ms": round(self.total_run_seconds / finished * 1000, 3) if finished else 0.0
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+
+# ML/NLP work (duplicate detection, index builds)
+ml_executor = BoundedExecutor(
+    "ml",
+    max_workers=int(os.getenv("ML_MAX_WORKERS", "2")),
+    max_concurrency=int(os.getenv("ML_MAX_CONCURRENT_JOBS", "0")) or None
+)
+
+# bcrypt hashing/verification for logins and registrations (bcrypt releases the GIL)
+password_executor = BoundedExecutor(
+    "password",
+    max_workers=int(os.getenv("PASSWORD_MAX_WORKERS", "4")),
+    max_concurrency=int(os.getenv("PASSWORD_MAX_CONCURRENT_JOBS", "0")) or None
+)
@@ -0,0 +1,122 @@
+"""
+Index registry.
+Declares the indexes each collection needs for the queries the API
+actually runs; ensure_indexes() creates them idempotently at startup and
+manage_indexes.py reports missing or unused ones.
+
+Compound indexes put equality fields first and the sort field last, so
+filtered lists sorted by created_at are served from the index without an
+in-memory sort. Each branch of an $or query needs its own index.
+"""
+from typing import Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # Login, registration and current-user lookups
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        # Caretaker list
+        IndexModel([("role", ASCENDING)], name="role"),
+        # Revoked token versions, reloaded by every worker (only revoked users are indexed)
+        IndexModel(
+            [("token_version", ASCENDING)],
+            name="token_version_revoked",
+            partialFilterExpression={"token_version": {"$gt": 0}}
+        ),
+    ],
+    "issues": [
+        # Issue lists sort by (created_at, _id) and cursor pages seek on it, so
+        # _id ends each list index; without it the sort would run in memory.
+        # Admin issue list and recent-issue counts, newest first
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id"),
+        # Student issue list: {$or: [{is_public: true}, {created_by: email}]} sorted by created_at
+        IndexModel(
+            [("is_public", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="is_public_created_at_id"
+        ),
+        IndexModel(
+            [("created_by", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="created_by_created_at_id"
+        ),
+        # Status/category/priority filters sorted by created_at; status also
+        # serves dashboard counts and the delayed-issue scan (status + created_at range)
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="status_created_at_id"
+        ),
+        IndexModel(
+            [("category", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="category_created_at_id"
+        ),
+        IndexModel(
+            [("priority", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="priority_created_at_id"
+        ),
+        # Dashboard hostel/block distribution and heatmap
+        IndexModel([("hostel", ASCENDING), ("block", ASCENDING)], name="hostel_block"),
+        # Duplicate index catch-up after loading a snapshot
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+        # Clearing stale duplicate cluster ids (only clustered issues are indexed)
+        IndexModel([("duplicate_cluster_run", ASCENDING)], name="duplicate_cluster_run", sparse=True),
+    ],
+    "announcements": [
+        # Each branch of the hostel/block $or, newest first
+        IndexModel([("target_hostel", ASCENDING), ("created_at", DESCENDING)], name="target_hostel_created_at"),
+        IndexModel([("target_block", ASCENDING), ("created_at", DESCENDING)], name="target_block_created_at"),
+    ],
+    "lost_found": [
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+        IndexModel([("item_type", ASCENDING), ("created_at", DESCENDING)], name="item_type_created_at"),
+    ],
+    "duplicate_clusters": [
+        # Replacing the previous clustering run
+        IndexModel([("run_id", ASCENDING)], name="run_id"),
+        # Largest clusters first
+        IndexModel([("size", DESCENDING), ("cluster_id", ASCENDING)], name="size_cluster_id"),
+    ],
+    "rate_limits": [
+        # Idle login throttling buckets expire on their own; MongoRateLimitBackend
+        # also creates this index (under its default name) on first use
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_1", expireAfterSeconds=0),
+    ],
+}
+
+
+def index_key(key) -> tuple:
+    """Comparable key pattern of an IndexModel document or index_information() entry."""
+    fields = key.items() if hasattr(key, "items") else key
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction)
+                 for field, direction in fields)
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """
+    Create every registered index that does not exist yet. Existing indexes
+    are left alone, so this is cheap on every startup; an index that cannot
+    be built (e.g. duplicate emails for the unique index, or an index with
+    the same keys under another name) is reported and skipped.
+
+    Args:
+        db: Motor database
+
+    Returns:
+        Index names created per collection
+    """
+    created = {}
+    for collection, indexes in INDEXES.items():
+        existing = await db[collection].index_information()
+        missing = [index for index in indexes if index.document["name"] not in existing]
+        if not missing:
+            continue
+        try:
+            created[collection] = await db[collection].create_indexes(missing)
+        except OperationFailure:
+            # Build the rest one by one so a single bad index does not block them
+            created[collection] = []
+            for index in missing:
+                try:
+                    created[collection] += await db[collection].create_indexes([index])
+                except OperationFailure as e:
+                    print(f"❌ Could not create index {collection}.{index.document['name']}: {e}")
+    return created
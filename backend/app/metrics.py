@@ -0,0 +1,156 @@
+"""
+Prometheus metrics.
+Per-route HTTP latency and MongoDB command counts/durations, served at
+/metrics. MongoDB commands are attributed to the route whose request issued
+them through a context variable that Motor carries into its worker threads;
+commands issued outside a request (startup, background jobs) are labelled
+"background".
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory so /metrics aggregates all worker processes.
+
+/metrics is only served to scrapers presenting METRICS_TOKEN as a bearer
+token; without METRICS_TOKEN it is disabled (404).
+"""
+import hmac
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from fastapi import Header, HTTPException, Response, status
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, REGISTRY
+)
+
+# Bearer token the Prometheus scraper must send; /metrics is disabled when empty
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+BACKGROUND_ROUTE = "background"
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"]
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency by issuing route",
+    ["route", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total",
+    "Failed MongoDB commands by issuing route",
+    ["route", "command"]
+)
+# Round-trips per request; a route whose count grows with the data is an N+1
+MONGO_COMMANDS_PER_REQUEST = Histogram(
+    "mongodb_commands_per_request",
+    "MongoDB commands issued while serving one request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+)
+
+
+class RequestMetrics:
+    """MongoDB commands issued while serving one request, flushed when it finishes."""
+
+    def __init__(self):
+        self.finished = False
+        # (command name, seconds, failed)
+        self.commands: List[Tuple[str, float, bool]] = []
+        self._lock = threading.Lock()
+
+    def add(self, command: str, seconds: float, failed: bool) -> bool:
+        """Record a command; False once the request has finished."""
+        with self._lock:
+            if self.finished:
+                return False
+            self.commands.append((command, seconds, failed))
+            return True
+
+    def flush(self, route: str) -> None:
+        with self._lock:
+            self.finished = True
+            commands, self.commands = self.commands, []
+        MONGO_COMMANDS_PER_REQUEST.labels(route).observe(len(commands))
+        for command, seconds, failed in commands:
+            observe_command(route, command, seconds, failed)
+
+
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+
+def observe_command(route: str, command: str, seconds: float, failed: bool) -> None:
+    MONGO_COMMAND_SECONDS.labels(route, command).observe(seconds)
+    if failed:
+        MONGO_COMMAND_FAILURES.labels(route, command).inc()
+
+
+def record_command(command: str, seconds: float, failed: bool = False) -> None:
+    """Attribute a finished MongoDB command to the current request, if any."""
+    request = current_request.get()
+    if request is None or not request.add(command, seconds, failed):
+        observe_command(BACKGROUND_ROUTE, command, seconds, failed)
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware timing each HTTP request and flushing the MongoDB
+    commands it issued under its route template (e.g. /api/issues/{issue_id}).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics()
+        token = current_request.set(request)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route_path, str(status_code)).observe(
+                time.perf_counter() - started
+            )
+            request.flush(route_path)
+
+
+def require_metrics_token(authorization: Optional[str] = Header(None)) -> None:
+    """Dependency admitting only scrapers that send METRICS_TOKEN as a bearer token."""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def metrics_response() -> Response:
+    """Prometheus exposition of all metrics (every worker process in multiprocess mode)."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
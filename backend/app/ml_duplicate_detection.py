@@ -1,159 +1,1283 @@
-import re
-from typing import List, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import json
+import os
+import shutil
+import threading
+import zlib
+from datetime import datetime
+from typing import Callable, Iterable, List, Dict, NamedTuple, Optional, Set, Tuple
+from sklearn.preprocessing import normalize
+from sklearn.utils import murmurhash3_32
+from scipy.sparse.csgraph import connected_components
+import scipy.sparse as sp
 import numpy as np
+from app import text_processing
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# LSH candidate generation: with 2 rows per band, issues whose term sets have
+# Jaccard similarity 0.2 are shortlisted with ~86% probability (48 bands)
+DUPLICATE_LSH_BANDS = int(os.getenv("DUPLICATE_LSH_BANDS", "48"))
+DUPLICATE_LSH_ROWS = int(os.getenv("DUPLICATE_LSH_ROWS", "2"))
+# Below this many indexed issues an exact scan is cheaper than LSH lookups
+DUPLICATE_ANN_MIN_DOCS = int(os.getenv("DUPLICATE_ANN_MIN_DOCS", "5000"))
+# "vocabulary" keeps a term -> column map; "hashing" hashes terms into a fixed
+# number of columns, so index memory no longer grows with the vocabulary
+DUPLICATE_INDEX_BACKEND = os.getenv("DUPLICATE_INDEX_BACKEND", "vocabulary")
+DUPLICATE_HASHING_FEATURES = int(os.getenv("DUPLICATE_HASHING_FEATURES", str(2 ** 18)))
+# Only the most frequent terms are weighted, as TfidfVectorizer(max_features=5000) did (0 for no cap)
+DUPLICATE_MAX_FEATURES = int(os.getenv("DUPLICATE_MAX_FEATURES", "5000"))
+# Pending or removed rows are folded into the count matrix past this many
+# (or a quarter of the compacted rows), so compaction cost is amortized
+COMPACT_MIN_ROWS = 256
+
+# Bump when the snapshot layout or the text analysis changes; older snapshots are ignored
+SNAPSHOT_FORMAT_VERSION = 3
+SNAPSHOT_POINTER = "CURRENT"
+
+
+class MinHashLSH:
+    """
+    MinHash signatures over term sets, bucketed per band (banded LSH).
+    Documents sharing at least one band bucket with a query are returned as
+    candidates; exact cosine similarity is computed only for those.
+
+    Term sets are given as arrays of stable 32-bit term hashes.
+    """
+
+    _PRIME = np.uint64((1 << 61) - 1)
+    # Term hashes per chunk when signing many documents; bounds the
+    # (terms x hash functions) temporary to a few MB
+    _CHUNK = 8192
+
+    def __init__(self, bands: int = 48, rows: int = 2, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.bands = bands
+        self.rows = rows
+        self.seed = seed
+        self._a = rng.integers(1, 1 << 32, size=bands * rows, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=bands * rows, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(bands)]
+        self._band_keys: Dict[str, List[bytes]] = {}
+        self._imported = np.zeros((0, bands, rows), dtype=np.uint64)
+        self._imported_rows: Dict[str, int] = {}
+
+    def signatures(self, hashes: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+        """
+        MinHash signatures of many term sets at once, given CSR-style: set i
+        is hashes[indptr[i]:indptr[i + 1]]. Empty sets get all-zero rows.
+
+        Returns:
+            Array of shape (len(indptr) - 1, bands * rows)
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        indptr = np.asarray(indptr, dtype=np.int64)
+        signatures = np.zeros((len(indptr) - 1, self.bands * self.rows), dtype=np.uint64)
+        nonempty = np.flatnonzero(np.diff(indptr))
+        pos = 0
+        while pos < len(nonempty):
+            first = nonempty[pos]
+            # Whole sets only, at least one per chunk
+            end = max(int(np.searchsorted(indptr, indptr[first] + self._CHUNK, side="right")) - 1, first + 1)
+            chunk = nonempty[pos:int(np.searchsorted(nonempty, end))]
+            lo, hi = indptr[first], indptr[end]
+            values = (np.outer(hashes[lo:hi], self._a) + self._b) % self._PRIME
+            # Non-empty sets are contiguous, so each segment runs to the next set's start
+            signatures[chunk] = np.minimum.reduceat(values, indptr[chunk] - lo, axis=0)
+            pos += len(chunk)
+        return signatures
+
+    def band_keys(self, hashes: np.ndarray) -> List[bytes]:
+        """Bucket key of each band for the MinHash signature of a term set."""
+        if not len(hashes):
+            return []
+        signature = self.signatures(hashes, np.array([0, len(hashes)]))[0]
+        return [band.tobytes() for band in signature.reshape(self.bands, self.rows)]
+
+    def insert(self, key: str, hashes: np.ndarray) -> None:
+        self._insert_band_keys(key, self.band_keys(hashes))
+
+    def _insert_band_keys(self, key: str, band_keys: List[bytes]) -> None:
+        self.remove(key)
+        for bucket, band_key in zip(self._buckets, band_keys):
+            bucket.setdefault(band_key, set()).add(key)
+        self._band_keys[key] = band_keys
+
+    def _stored_band_keys(self, key: str, pop: bool = False) -> List[bytes]:
+        band_keys = self._band_keys.pop(key, None) if pop else self._band_keys.get(key)
+        if band_keys is None:
+            # Imported keys keep their signature in the bulk array until first changed
+            row = self._imported_rows.pop(key, None) if pop else self._imported_rows.get(key)
+            if row is None:
+                return []
+            band_keys = [band.tobytes() for band in self._imported[row]]
+        return band_keys
+
+    def remove(self, key: str) -> None:
+        for bucket, band_key in zip(self._buckets, self._stored_band_keys(key, pop=True)):
+            members = bucket.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del bucket[band_key]
+
+    def candidates(self, hashes: np.ndarray) -> Set[str]:
+        result: Set[str] = set()
+        for bucket, band_key in zip(self._buckets, self.band_keys(hashes)):
+            result.update(bucket.get(band_key, ()))
+        return result
+
+    def export_signatures(self, keys: List[str]) -> np.ndarray:
+        """MinHash signatures of keys as a (len(keys), bands * rows) array; empty documents are all zero."""
+        signatures = np.zeros((len(keys), self.bands * self.rows), dtype=np.uint64)
+        for i, key in enumerate(keys):
+            band_keys = self._stored_band_keys(key)
+            if band_keys:
+                signatures[i] = np.frombuffer(b"".join(band_keys), dtype=np.uint64)
+        return signatures
+
+    def import_signatures(self, keys: List[str], signatures: np.ndarray) -> None:
+        """
+        Bulk-insert keys into an empty LSH from signatures (see signatures()).
+        Buckets are grouped per band with NumPy instead of one insert per key.
+        """
+        # A view of the (possibly memory-mapped) array; only temporaries are copied
+        signatures = signatures.reshape(len(keys), self.bands, self.rows)
+        keep = np.flatnonzero(signatures.any(axis=(1, 2)))
+        if not len(keep):
+            return
+        key_array = np.array(keys, dtype=object)[keep]
+        for band, bucket in enumerate(self._buckets):
+            # Sort the band's signatures so equal buckets are adjacent
+            column = signatures[keep, band, :]
+            order = np.lexsort(column.T[::-1])
+            ordered = column[order]
+            starts = np.concatenate([[0], np.flatnonzero((ordered[1:] != ordered[:-1]).any(axis=1)) + 1])
+            ends = np.append(starts[1:], len(order)).tolist()
+            members = key_array[order].tolist()
+            for start, end in zip(starts.tolist(), ends):
+                bucket.setdefault(ordered[start].tobytes(), set()).update(members[start:end])
+        self._imported = signatures
+        self._imported_rows = {keys[row]: row for row in keep.tolist()}
+
+
+class Query(NamedTuple):
+    """A vectorized query: its L2-normalized TF-IDF row and the IDF it was weighted with."""
+    vector: sp.csr_matrix
+    idf: np.ndarray
+
+
+class DuplicateIndex:
+    """
+    Long-lived TF-IDF index over open issues.
+
+    Keeps the vocabulary, document frequencies and raw term counts in memory
+    so issues can be added, updated and removed incrementally; an update
+    only touches the counts of its own terms. IDF weights and row norms are
+    applied when a query is scored, so nothing is re-weighted after a
+    change. Scores are those of TfidfVectorizer(max_features=max_features)
+    fitted on the indexed documents plus the query, as the detector did
+    before the index was kept.
+
+    Once the index holds ann_min_docs issues, queries score only the
+    candidates proposed by MinHash LSH instead of every document, so latency
+    stays flat as the number of open issues grows. The LSH tables are built
+    (in one vectorized pass over the counts) the first time a search needs
+    them, and maintained incrementally from then on.
+
+    Public methods are guarded by a lock so queries can run in worker
+    threads while the event loop applies updates.
+    """
+
+    backend = "vocabulary"
+
+    def __init__(
+        self,
+        analyzer: Callable[[str], List[str]],
+        lsh: Optional[MinHashLSH] = None,
+        ann_min_docs: int = DUPLICATE_ANN_MIN_DOCS,
+        max_features: int = DUPLICATE_MAX_FEATURES
+    ):
+        self.analyzer = analyzer
+        self.lsh = lsh or MinHashLSH(DUPLICATE_LSH_BANDS, DUPLICATE_LSH_ROWS)
+        self.ann_min_docs = ann_min_docs
+        self.max_features = max_features
+        self._lock = threading.RLock()
+        self.vocabulary: Dict[str, int] = {}
+        self.feature_names: List[str] = []
+        self.version = 0
+        # Per column: number of documents containing the term, and its total count
+        self._df = np.zeros(1024, dtype=np.int64)
+        self._totals = np.zeros(1024, dtype=np.float64)
+        # crc32 of each column's term: stable across processes, unlike hash()
+        self._hashes = np.zeros(1024, dtype=np.uint64)
+        self._lsh_ready = False
+        self._meta: Dict[str, dict] = {}
+        self._partitions: Dict[Tuple, Set[str]] = {}
+        self._partition_of: Dict[str, Tuple] = {}
+        # Compacted rows: raw counts, their squares (for norms) and a liveness mask
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._counts = sp.csr_matrix((0, 0), dtype=np.float64)
+        self._squares = sp.csr_matrix((0, 0), dtype=np.float64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._dead = 0
+        # Issues added since the last compaction
+        self._pending: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._meta
+
+    @property
+    def n_features(self) -> int:
+        return len(self.feature_names)
+
+    def _column(self, term: str, grow: bool) -> Optional[int]:
+        """Column of term; unknown terms get a new column when grow is set, else None."""
+        col = self.vocabulary.get(term)
+        if col is None and grow:
+            col = len(self.feature_names)
+            self.vocabulary[term] = col
+            self.feature_names.append(term)
+            if col >= len(self._df):
+                self._df = np.concatenate([self._df, np.zeros_like(self._df)])
+                self._totals = np.concatenate([self._totals, np.zeros_like(self._totals)])
+                self._hashes = np.concatenate([self._hashes, np.zeros_like(self._hashes)])
+            self._hashes[col] = zlib.crc32(term.encode())
+        return col
+
+    def _column_hashes(self, cols: np.ndarray) -> np.ndarray:
+        """LSH term hashes of columns."""
+        return self._hashes[cols]
+
+    def _term_hashes(self, terms: List[str]) -> np.ndarray:
+        """LSH term hashes of a query's distinct terms, known to the index or not."""
+        unique = set(terms)
+        return np.fromiter((zlib.crc32(term.encode()) for term in unique), dtype=np.uint64, count=len(unique))
+
+    def _feature_names(self, cols: Iterable[int], terms: Iterable[str] = ()) -> List[Optional[str]]:
+        """Names of columns; terms is unused here since the vocabulary is kept."""
+        return [self.feature_names[col] for col in cols]
+
+    def _term_counts(self, terms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Count terms as (sorted columns, counts), adding unknown terms to the vocabulary."""
+        counts: Dict[int, int] = {}
+        for term in terms:
+            col = self._column(term, grow=True)
+            counts[col] = counts.get(col, 0) + 1
+        cols = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        order = np.argsort(cols)
+        return cols[order], values[order]
+
+    def add(
+        self,
+        key: str,
+        text: str,
+        meta: Optional[dict] = None,
+        partition: Optional[Tuple] = None,
+        terms: Optional[List[str]] = None
+    ) -> None:
+        """
+        Add or replace the document stored under key in a partition.
+        Pre-analyzed terms may be passed to skip analyzing text.
+        """
+        if terms is None:
+            terms = self.analyzer(text)
+        with self._lock:
+            if key in self._meta:
+                self.remove(key)
+            cols, values = self._term_counts(terms)
+            self._df[cols] += 1
+            self._totals[cols] += values
+            self._pending[key] = (cols, values)
+            if self._lsh_ready:
+                self.lsh.insert(key, self._column_hashes(cols))
+            self._partitions.setdefault(partition, set()).add(key)
+            self._partition_of[key] = partition
+            self._meta[key] = meta or {}
+            self.version += 1
+            self._maybe_compact()
+
+    def remove(self, key: str) -> bool:
+        """Remove the document stored under key. Returns False if absent."""
+        with self._lock:
+            if key not in self._meta:
+                return False
+            cols, values = self._document_counts(key)
+            if self._pending.pop(key, None) is None:
+                self._alive[self._rows.pop(key)] = False
+                self._dead += 1
+            self._df[cols] -= 1
+            self._totals[cols] -= values
+            if self._lsh_ready:
+                self.lsh.remove(key)
+            partition = self._partition_of.pop(key)
+            members = self._partitions[partition]
+            members.discard(key)
+            if not members:
+                del self._partitions[partition]
+            del self._meta[key]
+            self.version += 1
+            self._maybe_compact()
+            return True
+
+    def metadata(self, key: str) -> Optional[dict]:
+        return self._meta.get(key)
+
+    def partition_size(self, partition: Tuple) -> int:
+        return len(self._partitions.get(partition, ()))
+
+    def _document_counts(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(columns, counts) of an indexed document, or None if absent."""
+        if key in self._pending:
+            return self._pending[key]
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        start, end = self._counts.indptr[row], self._counts.indptr[row + 1]
+        return self._counts.indices[start:end], self._counts.data[start:end]
+
+    def prepare(self) -> None:
+        """
+        Build the LSH tables now if searches will use them, so the first
+        duplicate check after a rebuild does not pay for it.
+        """
+        with self._lock:
+            if len(self._meta) >= self.ann_min_docs:
+                self._ensure_lsh()
+
+    def _ensure_lsh(self) -> None:
+        """Sign every indexed document and fill the LSH buckets, once."""
+        if self._lsh_ready:
+            return
+        keys, counts, _ = self._documents(None)
+        self.lsh.import_signatures(keys, self.lsh.signatures(self._column_hashes(counts.indices), counts.indptr))
+        self._lsh_ready = True
+
+    def _maybe_compact(self) -> None:
+        """Compact once pending or removed rows reach a quarter of the compacted rows."""
+        limit = max(COMPACT_MIN_ROWS, len(self._keys) // 4)
+        if len(self._pending) > limit or self._dead > limit:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Fold pending rows into the count matrix and drop removed ones."""
+        n_features = self.n_features
+        live = np.flatnonzero(self._alive)
+        base = self._counts[live]
+        base.resize((len(live), n_features))
+        pending = self._block(list(self._pending))
+
+        self._keys = [self._keys[i] for i in live] + list(self._pending)
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+        self._counts = sp.vstack([base, pending], format="csr")
+        self._squares = self._squared(self._counts)
+        self._alive = np.ones(len(self._keys), dtype=bool)
+        self._dead = 0
+        self._pending = {}
+
+    @staticmethod
+    def _squared(counts: sp.csr_matrix) -> sp.csr_matrix:
+        """Element-wise squares of counts, sharing its index arrays."""
+        return sp.csr_matrix((counts.data ** 2, counts.indices, counts.indptr), shape=counts.shape, copy=False)
+
+    def _block(self, keys: List[str]) -> sp.csr_matrix:
+        """Count rows of keys (compacted or pending) as one matrix."""
+        indptr = [0]
+        indices = []
+        data = []
+        for key in keys:
+            cols, values = self._document_counts(key)
+            indices.append(cols)
+            data.append(values)
+            indptr.append(indptr[-1] + len(cols))
+        return sp.csr_matrix(
+            (
+                np.concatenate(data) if data else np.zeros(0, dtype=np.float64),
+                np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+                np.array(indptr, dtype=np.int64),
+            ),
+            shape=(len(keys), self.n_features)
+        )
+
+    def _documents(self, keys: Optional[List[str]]) -> Tuple[List[str], sp.csr_matrix, sp.csr_matrix]:
+        """(keys, counts, squared counts) of keys, or of every indexed document when None."""
+        if keys is None:
+            if self._dead:
+                rows = np.flatnonzero(self._alive)
+                compacted = [self._keys[i] for i in rows]
+            else:
+                rows, compacted = None, self._keys
+            pending = list(self._pending)
+        else:
+            compacted = [key for key in keys if key in self._rows]
+            rows = np.fromiter((self._rows[key] for key in compacted), dtype=np.int64, count=len(compacted))
+            pending = [key for key in keys if key in self._pending]
+        counts = self._counts if rows is None else self._counts[rows]
+        squares = self._squares if rows is None else self._squares[rows]
+        if not pending:
+            return compacted, counts, squares
+        block = self._block(pending)
+        counts = sp.vstack([self._widen(counts), block], format="csr")
+        squares = sp.vstack([self._widen(squares), self._squared(block)], format="csr")
+        return compacted + pending, counts, squares
+
+    def _widen(self, matrix: sp.csr_matrix) -> sp.csr_matrix:
+        """matrix with columns added since it was built (no copy)."""
+        return sp.csr_matrix(
+            (matrix.data, matrix.indices, matrix.indptr),
+            shape=(matrix.shape[0], self.n_features),
+            copy=False
+        )
+
+    def _query_counts(self, term_lists: List[List[str]]) -> sp.csr_matrix:
+        """
+        Raw term counts of queries. Terms unknown to the index get extra
+        columns after the index vocabulary, since they still count towards
+        the queries' norms and document frequencies.
+        """
+        n_features = self.n_features
+        extra: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for terms in term_lists:
+            counts: Dict[int, int] = {}
+            for term in terms:
+                col = self._column(term, grow=False)
+                if col is None:
+                    col = extra.setdefault(term, n_features + len(extra))
+                counts[col] = counts.get(col, 0) + 1
+            indices.extend(counts.keys())
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        queries = sp.csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(term_lists), n_features + len(extra))
+        )
+        queries.sort_indices()
+        return queries
+
+    def _query_idf(self, queries: sp.csr_matrix) -> np.ndarray:
+        """
+        Smoothed IDF per column of queries, as TfidfVectorizer(smooth_idf=True)
+        computes it when fitted on the indexed documents plus the queries.
+        With max_features, columns outside the most frequent terms get weight 0.
+        """
+        n_features = self.n_features
+        width = queries.shape[1]
+        df = np.bincount(queries.indices, minlength=width).astype(np.float64)
+        df[:n_features] += self._df[:n_features]
+        n = len(self._meta) + queries.shape[0]
+        idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+        if self.max_features and width > self.max_features:
+            # astype: bincount of no queries (clustering) is int64 even with weights
+            totals = np.bincount(queries.indices, weights=queries.data, minlength=width).astype(np.float64)
+            totals[:n_features] += self._totals[:n_features]
+            idf[~self._top_features(totals)] = 0.0
+        return idf
+
+    def _top_features(self, totals: np.ndarray) -> np.ndarray:
+        """
+        Mask of the max_features columns with the highest total counts, as
+        TfidfVectorizer(max_features=...) keeps them. Ties at the cut-off go
+        to the lowest columns (scikit-learn's order among ties is unspecified).
+        """
+        keep = totals > 0
+        if np.count_nonzero(keep) <= self.max_features:
+            return keep
+        cut = len(totals) - self.max_features
+        threshold = np.partition(totals, cut)[cut]
+        keep = totals > threshold
+        ties = np.flatnonzero(totals == threshold)[:self.max_features - np.count_nonzero(keep)]
+        keep[ties] = True
+        return keep
+
+    def _score(
+        self,
+        queries: sp.csr_matrix,
+        idf: np.ndarray,
+        keys: Optional[List[str]]
+    ) -> Tuple[sp.csr_matrix, List[str], sp.csr_matrix]:
+        """
+        Cosine similarity of query counts with the documents under keys
+        (every document when None), both weighted with idf.
+        Call with the lock held.
+
+        Returns:
+            Tuple of (L2-normalized TF-IDF queries, document keys,
+            similarity matrix of queries x keys)
+        """
+        vectors = normalize(queries @ sp.diags(idf), norm="l2", copy=False).tocsr()
+        n_features = self.n_features
+        keys, counts, squares = self._documents(keys)
+        width = counts.shape[1]
+        idf = idf[:width]
+        norms = np.sqrt(squares @ (idf ** 2))
+        norms[norms == 0] = 1.0
+        # q·d = sum(q_tf * idf * d_tf * idf) / (|q| |d|), with vectors already divided by |q|
+        weighted = vectors[:, :n_features][:, :width] @ sp.diags(idf)
+        scores = (weighted @ counts.T) @ sp.diags(1.0 / norms)
+        return vectors, keys, scores.tocsr()
+
+    def query_vector(self, text: str) -> Query:
+        """
+        Project text onto the index vocabulary as an L2-normalized TF-IDF row.
+        Terms unknown to the index still contribute to the norm, as they
+        would if the query had been fitted together with the corpus.
+        """
+        with self._lock:
+            queries = self._query_counts([self.analyzer(text)])
+            idf = self._query_idf(queries)
+            vectors = normalize(queries @ sp.diags(idf), norm="l2", copy=False).tocsr()
+            return Query(vectors[:, :self.n_features], idf[:self.n_features])
+
+    def search(
+        self,
+        text: str,
+        partition: Optional[Tuple] = None,
+        exclude_partition: Optional[Tuple] = None,
+        terms: Optional[List[str]] = None
+    ) -> Tuple[Query, List[str], np.ndarray]:
+        """
+        Vectorize text and score it in one step, so concurrent updates cannot
+        change the vocabulary in between.
+
+        Only documents in partition are scored when one is given. Partitions
+        (or whole indexes) smaller than ann_min_docs are scanned exactly;
+        larger ones score only the LSH shortlist.
+
+        Args:
+            text: Query text
+            partition: Restrict the search to this partition
+            exclude_partition: Skip documents of this partition
+            terms: Pre-analyzed terms of text
+
+        Returns:
+            Tuple of (query, issue keys, similarity scores)
+        """
+        if terms is None:
+            terms = self.analyzer(text)
+        with self._lock:
+            n_features = self.n_features
+            queries = self._query_counts([terms])
+            idf = self._query_idf(queries)
+            keys = self._candidate_keys([terms], partition, exclude_partition)
+            if keys is not None and not keys:
+                vectors = normalize(queries @ sp.diags(idf), norm="l2", copy=False).tocsr()
+                return Query(vectors[:, :n_features], idf[:n_features]), [], np.zeros(0)
+            vectors, keys, scores = self._score(queries, idf, keys)
+            return Query(vectors[:, :n_features], idf[:n_features]), keys, scores.toarray().ravel()
+
+    def _candidate_keys(
+        self,
+        term_lists: List[List[str]],
+        partition: Optional[Tuple] = None,
+        exclude_partition: Optional[Tuple] = None
+    ) -> Optional[List[str]]:
+        """
+        Keys worth scoring for the given queries, or None to score every document.
+        Call with the lock held.
+        """
+        def shortlist(members: Optional[Set[str]]) -> Set[str]:
+            size = len(self._meta) if members is None else len(members)
+            if size < self.ann_min_docs:
+                return set(self._meta) if members is None else members
+            self._ensure_lsh()
+            found: Set[str] = set()
+            for terms in term_lists:
+                found |= self.lsh.candidates(self._term_hashes(terms))
+            return found if members is None else found & members
+
+        if partition is None and exclude_partition is None and len(self._meta) < self.ann_min_docs:
+            return None
+        members = self._partitions.get(partition, set()) if partition is not None else None
+        keys = shortlist(members)
+        if exclude_partition is not None:
+            keys = keys - self._partitions.get(exclude_partition, set())
+        return list(keys)
+
+    def search_many(
+        self,
+        texts: List[str],
+        partitions: Optional[List[Tuple]] = None,
+        term_lists: Optional[List[List[str]]] = None
+    ) -> Tuple[sp.csr_matrix, np.ndarray, int, List[str], sp.csr_matrix]:
+        """
+        Vectorize several texts and score them against the index in one
+        sparse matrix product, weighted as if the index had been fitted
+        together with all of them.
+
+        Terms unknown to the index get extra columns after the index
+        vocabulary, so the returned query matrix can also be used to compare
+        the texts with each other. Candidates are the union over the given
+        partitions; callers must drop pairs whose partitions differ.
+
+        Args:
+            texts: Query texts
+            partitions: Optional partition per text
+            term_lists: Pre-analyzed terms of each text
+
+        Returns:
+            Tuple of (query matrix, its IDF weights, number of index columns,
+            candidate keys, similarity matrix of texts x candidate keys)
+        """
+        if term_lists is None:
+            term_lists = [self.analyzer(text) for text in texts]
+        with self._lock:
+            queries = self._query_counts(term_lists)
+            idf = self._query_idf(queries)
+            if partitions is None:
+                keys = self._candidate_keys(term_lists)
+            else:
+                keys = set()
+                for partition in set(partitions):
+                    members = [terms for terms, p in zip(term_lists, partitions) if p == partition]
+                    keys.update(self._candidate_keys(members, partition))
+                keys = list(keys)
+            vectors, keys, scores = self._score(queries, idf, keys)
+            return vectors, idf, self.n_features, keys, scores
+
+    def query(self, text: str) -> Tuple[List[str], np.ndarray]:
+        """Cosine similarity of text against every indexed document."""
+        _, keys, scores = self.search(text)
+        return keys, scores
+
+    def matching_terms(
+        self,
+        query: Query,
+        key: str,
+        top_n: int = 5,
+        terms: Iterable[str] = ()
+    ) -> List[str]:
+        """
+        Terms shared by a query and an indexed document, ranked by the
+        product of their TF-IDF weights (under the query's IDF), so no
+        extra vectorization is needed. terms are the query's own terms,
+        used to name columns when the index keeps no vocabulary.
+        """
+        with self._lock:
+            document = self._document_counts(key)
+            if document is None:
+                return []
+            cols, counts = document
+            common, query_pos, row_pos = np.intersect1d(
+                query.vector.indices, cols, assume_unique=True, return_indices=True
+            )
+            weights = query.vector.data[query_pos] * counts[row_pos] * query.idf[common]
+            order = np.argsort(-weights, kind="stable")
+            order = order[weights[order] > 0]
+            names = self._feature_names(common[order], terms)
+            return [name for name in names if name is not None][:top_n]
+
+    def term_weights(self, text: str) -> Dict[str, float]:
+        """
+        TF-IDF weight of each term in text, using the index IDF with text
+        counted as one more document. Terms cut by max_features weigh 0.
+        """
+        terms = self.analyzer(text)
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        with self._lock:
+            queries = self._query_counts([terms])
+            idf = self._query_idf(queries)
+            n_features = self.n_features
+            extra = n_features
+            weights = {}
+            for term, count in counts.items():
+                col = self._column(term, grow=False)
+                if col is None:
+                    # Unknown terms were given columns in order of first appearance
+                    col, extra = extra, extra + 1
+                weights[term] = count * idf[col]
+            return weights
+
+    def save(self, path: str, source_time: Optional[datetime] = None) -> Dict:
+        """
+        Write the index to a new snapshot directory.
+
+        Arrays are stored as .npy files so load() can memory-map them; keys,
+        metadata and partitions go to JSON files next to a manifest. The
+        lock is held only while the arrays to write are collected, so
+        queries and updates continue while the files are written.
+
+        Args:
+            path: Directory to create (must not exist)
+            source_time: When the indexed issues were read from the database
+
+        Returns:
+            The snapshot manifest
+        """
+        # Under the lock, only take what later updates could change: compaction
+        # replaces the count matrices and key list instead of modifying them
+        with self._lock:
+            if self._pending or self._dead:
+                self._compact()
+            n_features = self.n_features
+            counts, squares, keys = self._counts, self._squares, self._keys
+            df = self._df[:n_features].copy()
+            totals = self._totals[:n_features].copy()
+            feature_names = self.feature_names[:n_features]
+            meta = [self._meta[key] for key in keys]
+            partitions = [self._partition_of[key] for key in keys]
+            signatures = self.lsh.export_signatures(keys) if self._lsh_ready else None
+
+        # Written next to the final directory and renamed into place when complete
+        partial = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+        os.makedirs(partial)
+        try:
+            np.save(os.path.join(partial, "counts_data.npy"), counts.data)
+            np.save(os.path.join(partial, "counts_indices.npy"), counts.indices)
+            np.save(os.path.join(partial, "counts_indptr.npy"), counts.indptr)
+            np.save(os.path.join(partial, "squares_data.npy"), squares.data)
+            np.save(os.path.join(partial, "df.npy"), df)
+            np.save(os.path.join(partial, "totals.npy"), totals)
+            if signatures is not None:
+                np.save(os.path.join(partial, "lsh_signatures.npy"), signatures)
+            with open(os.path.join(partial, "vocabulary.json"), "w") as f:
+                json.dump(feature_names, f)
+            with open(os.path.join(partial, "documents.json"), "w") as f:
+                json.dump({"keys": keys, "meta": meta, "partitions": partitions}, f, default=str)
+            manifest = {
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "backend": self.backend,
+                "created_at": datetime.utcnow().isoformat(),
+                "source_time": source_time.isoformat() if source_time else None,
+                "documents": len(keys),
+                "features": n_features,
+                "lsh": {
+                    "bands": self.lsh.bands,
+                    "rows": self.lsh.rows,
+                    "seed": self.lsh.seed,
+                    "signatures": signatures is not None
+                }
+            }
+            with open(os.path.join(partial, "manifest.json"), "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.rename(partial, path)
+        except BaseException:
+            shutil.rmtree(partial, ignore_errors=True)
+            raise
+        return manifest
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        analyzer: Callable[[str], List[str]],
+        mmap: bool = True
+    ) -> "DuplicateIndex":
+        """
+        Load an index written by save().
+
+        With mmap, the count matrices are memory-mapped read-only,
+        so worker processes loading the same snapshot share its pages. The
+        first change to the index compacts into private in-memory arrays.
+
+        Raises:
+            ValueError: If the snapshot format, backend or LSH settings do not match
+        """
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported duplicate index snapshot format: {manifest.get('format_version')}")
+        if manifest.get("backend") != cls.backend:
+            raise ValueError(f"Duplicate index snapshot uses the {manifest.get('backend')} backend, not {cls.backend}")
+        lsh_config = manifest["lsh"]
+        if (lsh_config["bands"], lsh_config["rows"]) != (DUPLICATE_LSH_BANDS, DUPLICATE_LSH_ROWS):
+            raise ValueError("Duplicate index snapshot was built with different LSH settings")
+
+        mode = "r" if mmap else None
+
+        def array(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+
+        with open(os.path.join(path, "vocabulary.json")) as f:
+            feature_names = json.load(f)
+        with open(os.path.join(path, "documents.json")) as f:
+            documents = json.load(f)
+
+        index = cls(
+            analyzer,
+            MinHashLSH(lsh_config["bands"], lsh_config["rows"], lsh_config["seed"]),
+            **cls._snapshot_options(manifest)
+        )
+        n_docs, n_features = len(documents["keys"]), manifest["features"]
+
+        index.feature_names = feature_names
+        index.vocabulary = {term: col for col, term in enumerate(feature_names)}
+        # Document frequencies and totals change on every update, so they are kept in memory
+        if len(index._df) < n_features:
+            index._df = np.zeros(2 * n_features, dtype=np.int64)
+            index._totals = np.zeros(2 * n_features, dtype=np.float64)
+        index._df[:n_features] = np.load(os.path.join(path, "df.npy"))
+        index._totals[:n_features] = np.load(os.path.join(path, "totals.npy"))
+        indices, indptr = array("counts_indices"), array("counts_indptr")
+        index._counts = sp.csr_matrix((array("counts_data"), indices, indptr), shape=(n_docs, n_features), copy=False)
+        index._squares = sp.csr_matrix((array("squares_data"), indices, indptr), shape=(n_docs, n_features), copy=False)
+        index._alive = np.ones(n_docs, dtype=bool)
+        index._keys = documents["keys"]
+        index._rows = {key: row for row, key in enumerate(index._keys)}
+        for key, meta, partition in zip(index._keys, documents["meta"], documents["partitions"]):
+            partition = tuple(partition) if partition is not None else None
+            index._meta[key] = meta
+            index._partition_of[key] = partition
+            index._partitions.setdefault(partition, set()).add(key)
+        if len(index._hashes) < len(feature_names):
+            index._hashes = np.zeros(2 * len(feature_names), dtype=np.uint64)
+        index._hashes[:len(feature_names)] = np.fromiter(
+            (zlib.crc32(term.encode()) for term in feature_names), dtype=np.uint64, count=len(feature_names)
+        )
+        if lsh_config["signatures"]:
+            index.lsh.import_signatures(index._keys, array("lsh_signatures"))
+            index._lsh_ready = True
+        return index
+
+    @classmethod
+    def _snapshot_options(cls, manifest: Dict) -> Dict:
+        """Constructor arguments recorded in a snapshot manifest."""
+        return {}
+
+    def clusters(
+        self,
+        threshold: float,
+        top_terms: int = 5,
+        document_text: Optional[Callable[[str], str]] = None
+    ) -> List[Dict]:
+        """
+        Group documents of each partition into connected components of the
+        graph whose edges are pairs with cosine similarity >= threshold.
+
+        Args:
+            threshold: Similarity linking two documents
+            top_terms: Keywords per group
+            document_text: Text of an indexed key, to name keyword columns
+                when the index keeps no vocabulary
+
+        Returns:
+            One dict per group of two or more documents with 'partition',
+            'keys', 'representative' (key closest to the group centroid)
+            and 'keywords' (highest summed TF-IDF weight)
+        """
+        with self._lock:
+            if self._pending or self._dead:
+                self._compact()
+            partitions = [(partition, list(members)) for partition, members in self._partitions.items()]
+            counts = self._counts
+            idf = self._query_idf(sp.csr_matrix((0, self.n_features)))
+            row_of = dict(self._rows)
+        if not row_of:
+            return []
+
+        matrix = normalize(counts @ sp.diags(idf[:counts.shape[1]]), norm="l2", copy=False).tocsr()
+
+        groups = []
+        for partition, keys in partitions:
+            if len(keys) < 2:
+                continue
+            rows = np.fromiter((row_of[key] for key in keys), dtype=np.int64, count=len(keys))
+            vectors = matrix[rows]
+            similarity = (vectors @ vectors.T).tocsr()
+            similarity.data[similarity.data < threshold] = 0.0
+            similarity.eliminate_zeros()
+            n_components, labels = connected_components(similarity, directed=False)
+            sizes = np.bincount(labels, minlength=n_components)
+            if not (sizes > 1).any():
+                continue
+            # Column sums of every component at once: (components x docs) @ (docs x features)
+            indicator = sp.csr_matrix(
+                (np.ones(len(keys)), (labels, np.arange(len(keys)))),
+                shape=(n_components, len(keys))
+            )
+            centroids = (indicator @ vectors).tocsr()
+            centroids.sort_indices()
+            affinity = np.asarray(vectors.multiply(centroids[labels]).sum(axis=1)).ravel()
+            by_component = np.argsort(labels, kind="stable")
+            starts = np.cumsum(sizes) - sizes
+            for component in np.flatnonzero(sizes > 1):
+                positions = by_component[starts[component]:starts[component] + sizes[component]]
+                closest = positions[int(np.argmax(affinity[positions]))]
+                start, end = centroids.indptr[component], centroids.indptr[component + 1]
+                order = np.argsort(-centroids.data[start:end], kind="stable")
+                group_keys = [keys[i] for i in positions]
+                member_terms = (
+                    term for key in group_keys for term in self.analyzer(document_text(key))
+                ) if document_text else ()
+                names = self._feature_names(centroids.indices[start:end][order], member_terms)
+                groups.append({
+                    "partition": partition,
+                    "keys": group_keys,
+                    "representative": keys[closest],
+                    "keywords": [name for name in names if name is not None][:top_terms]
+                })
+        return groups
+
+
+class HashingDuplicateIndex(DuplicateIndex):
+    """
+    DuplicateIndex over a fixed-size hashed feature space (the hashing trick).
+
+    Terms map to columns with murmurhash3 modulo n_features, as in
+    scikit-learn's HashingVectorizer, so no vocabulary is stored and adding
+    an issue never fits or grows anything; document frequencies are kept per
+    column. Colliding terms share a column, which slightly blurs similarity
+    for large vocabularies (2**18 columns keeps collisions rare).
+
+    Column names are recovered from the terms of the text at hand (the
+    query, or cluster members), since hashed columns cannot be reversed.
+    """
+
+    backend = "hashing"
+
+    def __init__(
+        self,
+        analyzer: Callable[[str], List[str]],
+        lsh: Optional[MinHashLSH] = None,
+        ann_min_docs: int = DUPLICATE_ANN_MIN_DOCS,
+        max_features: int = DUPLICATE_MAX_FEATURES,
+        n_features: int = DUPLICATE_HASHING_FEATURES
+    ):
+        super().__init__(analyzer, lsh, ann_min_docs, max_features)
+        self._n_features = n_features
+        self._df = np.zeros(n_features, dtype=np.int64)
+        self._totals = np.zeros(n_features, dtype=np.float64)
+
+    @property
+    def n_features(self) -> int:
+        return self._n_features
+
+    def _column(self, term: str, grow: bool) -> Optional[int]:
+        return murmurhash3_32(term, positive=True) % self._n_features
+
+    def _column_hashes(self, cols: np.ndarray) -> np.ndarray:
+        # Columns already are term hashes
+        return np.asarray(cols, dtype=np.uint64)
+
+    def _term_hashes(self, terms: List[str]) -> np.ndarray:
+        unique = {self._column(term, grow=False) for term in terms}
+        return np.fromiter(unique, dtype=np.uint64, count=len(unique))
+
+    def _feature_names(self, cols: Iterable[int], terms: Iterable[str] = ()) -> List[Optional[str]]:
+        names: Dict[int, str] = {}
+        for term in terms:
+            names.setdefault(self._column(term, grow=False), term)
+        return [names.get(col) for col in cols]
+
+    @classmethod
+    def _snapshot_options(cls, manifest: Dict) -> Dict:
+        if manifest["features"] != DUPLICATE_HASHING_FEATURES:
+            raise ValueError("Duplicate index snapshot was built with a different DUPLICATE_HASHING_FEATURES")
+        return {"n_features": manifest["features"]}
+
+
+INDEX_BACKENDS = {
+    DuplicateIndex.backend: DuplicateIndex,
+    HashingDuplicateIndex.backend: HashingDuplicateIndex
+}
+
 
 class DuplicateDetector:
-    def __init__(self, similarity_threshold: float = 0.7):
+    def __init__(self, similarity_threshold: float = 0.7, backend: Optional[str] = None):
+        backend = backend or DUPLICATE_INDEX_BACKEND
+        if backend not in INDEX_BACKENDS:
+            raise ValueError(f"Unknown duplicate index backend: {backend}")
         self.similarity_threshold = similarity_threshold
-        self.vectorizer = TfidfVectorizer(
-            max_features=5000,
-            stop_words='english',
-            ngram_range=(1, 2),
-            min_df=1
+        self.index_class = INDEX_BACKENDS[backend]
+        self.index = self.new_index()
+        self._generation = 0
+
+    @property
+    def index_version(self) -> Tuple[int, int]:
+        """Changes whenever the indexed issues change, including full rebuilds"""
+        return (self._generation, self.index.version)
+
+    def new_index(self) -> DuplicateIndex:
+        """Create an empty index sharing this detector's text analysis."""
+        return self.index_class(self.analyze)
+
+    # Text analysis is shared with issue search and needs no ML imports
+    tokenize = staticmethod(text_processing.tokenize)
+    terms_from_tokens = staticmethod(text_processing.terms_from_tokens)
+    analyze = staticmethod(text_processing.analyze)
+    search_fields = staticmethod(text_processing.search_fields)
+    preprocess_text = staticmethod(text_processing.preprocess_text)
+
+    @staticmethod
+    def issue_text(issue: Dict) -> str:
+        """Combined title + description used for similarity"""
+        return f"{issue.get('title', '')} {issue.get('description', '')}"
+
+    @staticmethod
+    def issue_key(issue: Dict) -> str:
+        return str(issue.get("id") or issue.get("_id", ""))
+
+    @staticmethod
+    def partition_key(issue: Dict) -> Tuple:
+        """Issues are only compared within the same hostel, block and category"""
+        return (issue.get("hostel"), issue.get("block"), issue.get("category"))
+
+    def _issue_metadata(self, issue: Dict) -> Dict:
+        return {
+            "id": self.issue_key(issue),
+            "title": issue.get("title", ""),
+            "description": issue.get("description", ""),
+            "status": issue.get("status", ""),
+            "hostel": issue.get("hostel"),
+            "block": issue.get("block"),
+            "category": issue.get("category")
+        }
+
+    def _add_to_index(self, index: DuplicateIndex, issue: Dict) -> None:
+        tokens = issue.get("search_tokens")
+        index.add(
+            self.issue_key(issue),
+            self.issue_text(issue),
+            self._issue_metadata(issue),
+            partition=self.partition_key(issue),
+            terms=self.terms_from_tokens(tokens) if tokens is not None else None
         )
-    
-    def preprocess_text(self, text: str) -> str:
-        """Clean and preprocess text for better similarity matching"""
-        # Convert to lowercase
-        text = text.lower()
-        # Remove special characters but keep spaces
-        text = re.sub(r'[^a-z0-9\s]', ' ', text)
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-    
+
+    def build(self, issues: List[Dict]) -> DuplicateIndex:
+        """
+        Build a fresh index from issues without swapping it in.
+        Closed issues are skipped; they are never reported as duplicates.
+
+        Args:
+            issues: Issue documents with 'title', 'description' and 'status'
+
+        Returns:
+            The newly built index
+        """
+        index = self.new_index()
+        for issue in issues:
+            if issue.get("status") != "closed":
+                self._add_to_index(index, issue)
+        index.prepare()
+        return index
+
+    def use_index(self, index: DuplicateIndex, updates: Iterable[Tuple[str, object]] = ()) -> None:
+        """Apply updates (see apply_updates()) to index, then swap it in."""
+        self._apply_updates(index, updates)
+        self.index = index
+        self._generation += 1
+
+    def build_index(self, issues: List[Dict]) -> DuplicateIndex:
+        """Build a fresh index from issues and swap it in."""
+        index = self.build(issues)
+        self.use_index(index)
+        return index
+
+    def save_snapshot(self, directory: str, source_time: Optional[datetime] = None, keep: int = 2) -> Dict:
+        """
+        Save the current index as a new versioned snapshot under directory
+        and point the CURRENT file at it. The pointer is replaced atomically,
+        so workers loading concurrently see either the old or the new snapshot.
+
+        Args:
+            directory: Snapshot root directory
+            source_time: When the indexed issues were read from the database
+            keep: Number of snapshots to keep (older ones are deleted)
+
+        Returns:
+            The snapshot manifest, including its 'name'
+        """
+        os.makedirs(directory, exist_ok=True)
+        name = f"snapshot-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{os.getpid()}"
+        manifest = self.index.save(os.path.join(directory, name), source_time)
+        pointer = os.path.join(directory, SNAPSHOT_POINTER)
+        with open(f"{pointer}.{os.getpid()}.tmp", "w") as f:
+            f.write(name)
+        os.replace(f"{pointer}.{os.getpid()}.tmp", pointer)
+
+        snapshots = sorted(d for d in os.listdir(directory) if d.startswith("snapshot-"))
+        for old in snapshots[:-keep] if keep > 0 else []:
+            if old != name:
+                # Workers that memory-mapped an old snapshot keep their open mappings
+                shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+        return {**manifest, "name": name}
+
+    @staticmethod
+    def snapshot_manifest(directory: str) -> Optional[Dict]:
+        """Manifest of the current snapshot in directory, or None if there is none."""
+        try:
+            with open(os.path.join(directory, SNAPSHOT_POINTER)) as f:
+                name = f.read().strip()
+            with open(os.path.join(directory, name, "manifest.json")) as f:
+                return {**json.load(f), "name": name}
+        except (OSError, ValueError):
+            return None
+
+    def load_snapshot(self, directory: str) -> Optional[Dict]:
+        """
+        Swap in the current snapshot from directory (memory-mapped).
+
+        Returns:
+            The loaded snapshot's manifest, or None if there is no usable snapshot
+        """
+        manifest = self.snapshot_manifest(directory)
+        if manifest is None or manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            return None
+        try:
+            index = self.index_class.load(os.path.join(directory, manifest["name"]), self.analyze)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring duplicate index snapshot {manifest['name']}: {e}")
+            return None
+        self.index = index
+        self._generation += 1
+        return manifest
+
+    def index_issue(self, issue: Dict) -> None:
+        """Add, update or (when closed) remove a single issue in the index"""
+        self._apply_updates(self.index, [("index_issue", issue)])
+
+    def remove_issue(self, issue_id: str) -> None:
+        self.index.remove(issue_id)
+
+    def apply_updates(self, updates: Iterable[Tuple[str, object]]) -> None:
+        """
+        Apply queued changes in order: ("index_issue", issue document) or
+        ("remove_issue", issue id).
+        """
+        self._apply_updates(self.index, updates)
+
+    def _apply_updates(self, index: DuplicateIndex, updates: Iterable[Tuple[str, object]]) -> None:
+        for method, arg in updates:
+            if method == "remove_issue":
+                index.remove(arg)
+            elif arg.get("status") == "closed":
+                index.remove(self.issue_key(arg))
+            else:
+                self._add_to_index(index, arg)
+
     def extract_keywords(self, text: str, top_n: int = 10) -> List[str]:
         """
         Extract top keywords from text using TF-IDF.
         Useful for highlighting matching keywords in UI.
-        
+        Weights come from the duplicate index IDF, so no vectorizer is fitted.
+
         Args:
             text: Input text
             top_n: Number of top keywords to return
-        
+
         Returns:
             List of top keywords
         """
-        processed_text = self.preprocess_text(text)
-        if not processed_text:
-            return []
-        
-        try:
-            vectorizer = TfidfVectorizer(
-                max_features=top_n,
-                stop_words='english',
-                ngram_range=(1, 2)
-            )
-            tfidf_matrix = vectorizer.fit_transform([processed_text])
-            feature_names = vectorizer.get_feature_names_out()
-            
-            # Get top keywords by TF-IDF score
-            scores = tfidf_matrix.toarray()[0]
-            keyword_scores = list(zip(feature_names, scores))
-            keyword_scores.sort(key=lambda x: x[1], reverse=True)
-            
-            return [word for word, score in keyword_scores[:top_n] if score > 0]
-        except Exception:
-            return []
-    
-    def find_matching_keywords(self, text1: str, text2: str) -> List[str]:
+        weights = self.index.term_weights(text)
+        ranked = sorted(weights.items(), key=lambda x: x[1], reverse=True)
+        return [word for word, score in ranked[:top_n] if score > 0]
+
+    def find_matching_keywords(self, text1: str, text2: str, top_n: int = 10) -> List[str]:
         """
         Find common keywords between two texts.
         Used for highlighting matching terms in duplicate detection UI.
-        
+
         Args:
             text1: First text
             text2: Second text
-        
+            top_n: Maximum number of keywords to return
+
         Returns:
-            List of matching keywords
+            List of matching keywords, highest combined weight first
         """
-        keywords1 = set(self.extract_keywords(text1))
-        keywords2 = set(self.extract_keywords(text2))
-        return list(keywords1.intersection(keywords2))
-    
+        weights1 = self.index.term_weights(text1)
+        weights2 = self.index.term_weights(text2)
+        common = [(term, weight * weights2[term]) for term, weight in weights1.items() if term in weights2]
+        common.sort(key=lambda x: x[1], reverse=True)
+        return [term for term, _ in common[:top_n]]
+
+    def _similar_issues(
+        self,
+        index: DuplicateIndex,
+        query: Query,
+        keys: List[str],
+        similarities: np.ndarray,
+        query_terms: Iterable[str] = ()
+    ) -> List[Dict]:
+        """Format indexed issues scoring at or above the threshold"""
+        similar_issues = []
+        for idx in np.where(similarities >= self.similarity_threshold)[0]:
+            issue_data = index.metadata(keys[idx])
+            if issue_data is None:
+                # Removed by a concurrent update
+                continue
+            similarity_score = float(similarities[idx])
+            similar_issues.append({
+                "id": issue_data["id"],
+                "title": issue_data["title"],
+                "description": issue_data["description"][:200] + "...",
+                "status": issue_data["status"],
+                "hostel": issue_data.get("hostel"),
+                "block": issue_data.get("block"),
+                "category": issue_data.get("category"),
+                "similarity_score": round(similarity_score, 3),
+                "similarity_percentage": round(similarity_score * 100, 1),
+                "matching_keywords": index.matching_terms(query, keys[idx], top_n=5, terms=query_terms)
+            })
+        return similar_issues
+
     def detect_duplicates(
-        self, 
-        new_issue_text: str, 
-        existing_issues: List[Dict]
+        self,
+        new_issue_text: str,
+        existing_issues: Optional[List[Dict]] = None,
+        partition: Optional[Tuple] = None,
+        cross_partition: bool = False
     ) -> Dict:
         """
         Detect if a new issue is similar to existing issues
-        
+
         Args:
             new_issue_text: Combined title + description of new issue
-            existing_issues: List of existing issues with 'title' and 'description'
-        
+            existing_issues: Optional explicit list of issues with 'title' and
+                'description'. When omitted, the long-lived index is searched.
+            partition: (hostel, block, category) of the new issue; only
+                issues in the same partition are compared when given
+            cross_partition: Search the other partitions when the new
+                issue's own partition has no duplicates
+
         Returns:
             Dict with is_duplicate, similarity_score, and similar_issues
         """
-        if not existing_issues:
+        if existing_issues is None:
+            index = self.index
+        else:
+            index = self.new_index()
+            for issue in existing_issues:
+                self._add_to_index(index, issue)
+
+        if not len(index):
             return {
                 "is_duplicate": False,
                 "similarity_score": 0.0,
                 "similar_issues": []
             }
-        
-        # Preprocess new issue
-        new_text = self.preprocess_text(new_issue_text)
-        
-        # Combine title and description for existing issues
-        existing_texts = []
-        for issue in existing_issues:
-            combined = f"{issue.get('title', '')} {issue.get('description', '')}"
-            existing_texts.append(self.preprocess_text(combined))
-        
-        # Add new text to the list for vectorization
-        all_texts = existing_texts + [new_text]
-        
+
         try:
-            # Create TF-IDF vectors
-            tfidf_matrix = self.vectorizer.fit_transform(all_texts)
-            
-            # Get the vector for the new issue (last one)
-            new_issue_vector = tfidf_matrix[-1]
-            
-            # Calculate cosine similarity with all existing issues
-            similarities = cosine_similarity(
-                new_issue_vector,
-                tfidf_matrix[:-1]  # All except the last one
-            )[0]
-            
-            # Find issues above threshold
-            similar_indices = np.where(similarities >= self.similarity_threshold)[0]
-            
-            similar_issues = []
-            max_similarity = 0.0
-            
-            for idx in similar_indices:
-                similarity_score = float(similarities[idx])
-                max_similarity = max(max_similarity, similarity_score)
-                
-                issue_data = existing_issues[idx]
-                existing_text = f"{issue_data.get('title', '')} {issue_data.get('description', '')}"
-                matching_keywords = self.find_matching_keywords(new_issue_text, existing_text)
-                
-                similar_issues.append({
-                    "id": str(issue_data.get("_id", "")),
-                    "title": issue_data.get("title", ""),
-                    "description": issue_data.get("description", "")[:200] + "...",
-                    "status": issue_data.get("status", ""),
-                    "similarity_score": round(similarity_score, 3),
-                    "similarity_percentage": round(similarity_score * 100, 1),
-                    "matching_keywords": matching_keywords[:5]  # Top 5 matching keywords
-                })
-            
+            # Cosine similarity with the partition's indexed issues
+            terms = index.analyzer(new_issue_text)
+            query, keys, similarities = index.search(new_issue_text, partition=partition, terms=terms)
+            similar_issues = self._similar_issues(index, query, keys, similarities, terms)
+
+            if not similar_issues and partition is not None and cross_partition:
+                query, keys, similarities = index.search(
+                    new_issue_text, exclude_partition=partition, terms=terms
+                )
+                similar_issues = self._similar_issues(index, query, keys, similarities, terms)
+
             # Sort by similarity score (descending)
             similar_issues.sort(key=lambda x: x["similarity_score"], reverse=True)
-            
+            max_similarity = similar_issues[0]["similarity_score"] if similar_issues else 0.0
+
             return {
                 "is_duplicate": len(similar_issues) > 0,
-                "similarity_score": round(max_similarity, 3) if max_similarity > 0 else 0.0,
+                "similarity_score": max_similarity,
                 "similar_issues": similar_issues[:5]  # Return top 5 most similar
             }
-            
+
         except Exception as e:
             # If vectorization fails, return no duplicates
             print(f"Error in duplicate detection: {e}")
@@ -163,5 +1287,129 @@ class DuplicateDetector:
                 "similar_issues": []
             }
 
+    def cluster_issues(self, threshold: Optional[float] = None) -> List[Dict]:
+        """
+        Cluster all indexed (open) issues into groups of likely duplicates.
+        Issues are only grouped within their hostel/block/category partition.
+
+        Args:
+            threshold: Similarity linking two issues (defaults to the
+                detection threshold)
+
+        Returns:
+            Clusters sorted by size (largest first); cluster_id is the
+            smallest issue id in the cluster, so it stays stable while
+            the cluster's oldest issue remains open
+        """
+        index = self.index
+        threshold = self.similarity_threshold if threshold is None else threshold
+        clusters = []
+        def document_text(key: str) -> str:
+            return self.issue_text(index.metadata(key) or {})
+
+        for group in index.clusters(threshold, document_text=document_text):
+            issue_ids = sorted(group["keys"])
+            representative = index.metadata(group["representative"]) or {}
+            hostel, block, category = group["partition"]
+            clusters.append({
+                "cluster_id": issue_ids[0],
+                "hostel": hostel,
+                "block": block,
+                "category": category,
+                "size": len(issue_ids),
+                "issue_ids": issue_ids,
+                "title": representative.get("title", ""),
+                "keywords": group["keywords"]
+            })
+        clusters.sort(key=lambda x: x["size"], reverse=True)
+        return clusters
+
+    def detect_duplicates_batch(
+        self,
+        texts: List[str],
+        partitions: Optional[List[Tuple]] = None
+    ) -> Dict:
+        """
+        Detect duplicates for many new issues in one vectorized pass.
+        Each text is compared with indexed issues in its partition and with
+        the other texts of the batch; batch items connected by above-threshold
+        similarity form duplicate groups.
+
+        Args:
+            texts: Combined title + description of each new issue
+            partitions: Optional (hostel, block, category) per text
+
+        Returns:
+            Dict with per-item results and the list of duplicate groups
+        """
+        index = self.index
+        term_lists = [index.analyzer(text) for text in texts]
+        queries, idf, n_features, keys, scores = index.search_many(texts, partitions, term_lists)
+
+        def same_partition(i: int, partition: Optional[Tuple]) -> bool:
+            return partitions is None or partitions[i] == partition
+
+        # Within-batch similarity, restricted to pairs in the same partition
+        pairwise = (queries @ queries.T).tocoo()
+        keep = (pairwise.row != pairwise.col) & (pairwise.data >= self.similarity_threshold)
+        pairs = [
+            (int(i), int(j), float(score))
+            for i, j, score in zip(pairwise.row[keep], pairwise.col[keep], pairwise.data[keep])
+            if same_partition(i, partitions[j] if partitions else None)
+        ]
+        graph = sp.coo_matrix(
+            (np.ones(len(pairs)), ([i for i, _, _ in pairs], [j for _, j, _ in pairs])),
+            shape=(len(texts), len(texts))
+        )
+        _, labels = connected_components(graph, directed=False)
+        members: Dict[int, List[int]] = {}
+        for item, label in enumerate(labels):
+            members.setdefault(int(label), []).append(item)
+        groups = [items for items in members.values() if len(items) > 1]
+        group_of = {item: group_id for group_id, items in enumerate(groups) for item in items}
+
+        batch_matches: Dict[int, List[Dict]] = {}
+        for i, j, score in pairs:
+            batch_matches.setdefault(i, []).append({
+                "index": j,
+                "similarity_score": round(score, 3),
+                "similarity_percentage": round(score * 100, 1)
+            })
+
+        # Only above-threshold scores are inspected per item
+        scores.data[scores.data < self.similarity_threshold] = 0.0
+        scores.eliminate_zeros()
+        known = queries[:, :n_features]
+        idf = idf[:n_features]
+        results = []
+        for i in range(len(texts)):
+            row = scores.getrow(i)
+            row_keys = []
+            row_scores = []
+            for col, score in zip(row.indices, row.data):
+                meta = index.metadata(keys[col])
+                if meta is not None and same_partition(i, self.partition_key(meta)):
+                    row_keys.append(keys[col])
+                    row_scores.append(score)
+            similar_issues = self._similar_issues(
+                index, Query(known.getrow(i), idf), row_keys, np.array(row_scores), term_lists[i]
+            )
+            similar_issues.sort(key=lambda x: x["similarity_score"], reverse=True)
+            batch_duplicates = sorted(batch_matches.get(i, []), key=lambda x: x["similarity_score"], reverse=True)
+            best = max(
+                [x["similarity_score"] for x in similar_issues[:1] + batch_duplicates[:1]],
+                default=0.0
+            )
+            results.append({
+                "index": i,
+                "is_duplicate": bool(similar_issues or batch_duplicates),
+                "similarity_score": best,
+                "similar_issues": similar_issues[:5],
+                "batch_duplicates": batch_duplicates,
+                "group": group_of.get(i)
+            })
+
+        return {"results": results, "groups": groups}
+
 # Global instance
 duplicate_detector = DuplicateDetector(similarity_threshold=0.7)
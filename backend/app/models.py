@@ -96,6 +96,8 @@ class IssueResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     resolved_at: Optional[datetime] = None
+    duplicate_cluster_id: Optional[str] = None
+    duplicate_cluster_size: Optional[int] = None
 
 class LostFoundCreate(BaseModel):
     item_name: str = Field(..., min_length=3, max_length=200)
@@ -142,3 +144,20 @@ class DuplicateCheckResponse(BaseModel):
     is_duplicate: bool
     similarity_score: float
     similar_issues: List[dict] = []
+
+class BatchDuplicateCheckRequest(BaseModel):
+    issues: List[IssueCreate] = Field(..., min_length=1, max_length=500)
+    hostel: Optional[str] = None
+    block: Optional[str] = None
+
+class BatchDuplicateCheckItem(BaseModel):
+    index: int
+    is_duplicate: bool
+    similarity_score: float
+    similar_issues: List[dict] = []
+    batch_duplicates: List[dict] = []
+    group: Optional[int] = None
+
+class BatchDuplicateCheckResponse(BaseModel):
+    results: List[BatchDuplicateCheckItem]
+    groups: List[List[int]] = []
@@ -0,0 +1,198 @@
+"""
+Login throttling.
+Token buckets per client IP and per account limit how fast logins are
+attempted, and admission control caps how many bcrypt verifications may
+be pending at once; excess requests are rejected early with 429s instead
+of queueing CPU work.
+
+Buckets live in a pluggable backend: in-process memory (the default, per
+API worker) or MongoDB, shared by all workers.
+"""
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Tuple
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from pymongo import ReturnDocument
+from app.auth import verify_password_async
+from app.database import get_database
+from app.executors import password_executor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# memory (per worker) or mongo (shared by all workers)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Burst size and sustained attempts per minute for each client IP
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+# Burst size and sustained attempts per minute for each account (submitted email)
+LOGIN_ACCOUNT_BURST = int(os.getenv("LOGIN_ACCOUNT_BURST", "5"))
+LOGIN_ACCOUNT_PER_MINUTE = float(os.getenv("LOGIN_ACCOUNT_PER_MINUTE", "3"))
+# Password verifications allowed to run or wait for the password pool at once
+LOGIN_MAX_PENDING_VERIFICATIONS = int(os.getenv(
+    "LOGIN_MAX_PENDING_VERIFICATIONS", str(password_executor.max_concurrency * 4)
+))
+# Use the first X-Forwarded-For address as the client IP (only behind a trusted proxy)
+RATE_LIMIT_TRUST_FORWARDED_FOR = os.getenv("RATE_LIMIT_TRUST_FORWARDED_FOR", "false").lower() == "true"
+
+
+class InMemoryRateLimitBackend:
+    """Token buckets in a bounded dict; each API worker limits independently."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> (tokens, updated_at monotonic seconds)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> Tuple[bool, float]:
+        """
+        Take one token from a bucket.
+
+        Returns:
+            Tuple of (allowed, seconds until a token is available)
+        """
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / refill_per_second
+
+
+class MongoRateLimitBackend:
+    """
+    Token buckets in the rate_limits collection, shared by all API workers.
+    Each take is a single atomic pipeline update (MongoDB 4.2+); idle
+    buckets are removed by a TTL index on expires_at.
+    """
+
+    def __init__(self, collection: str = "rate_limits"):
+        self.collection = collection
+        self._indexed = False
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> Tuple[bool, float]:
+        """
+        Take one token from a bucket.
+
+        Returns:
+            Tuple of (allowed, seconds until a token is available)
+        """
+        db = get_database()
+        if not self._indexed:
+            await db[self.collection].create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+
+        now = datetime.utcnow()
+        # A bucket refills completely within this time, after which it can be dropped
+        idle = timedelta(seconds=capacity / refill_per_second)
+        elapsed_seconds = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        bucket = await db[self.collection].find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [
+                        capacity,
+                        {"$add": [
+                            {"$ifNull": ["$tokens", capacity]},
+                            {"$multiply": [elapsed_seconds, refill_per_second]}
+                        ]}
+                    ]},
+                    "updated_at": now,
+                    "expires_at": now + idle
+                }},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["allowed"]:
+            return True, 0.0
+        return False, (1 - bucket["tokens"]) / refill_per_second
+
+
+RATE_LIMIT_BACKENDS = {
+    "memory": InMemoryRateLimitBackend,
+    "mongo": MongoRateLimitBackend
+}
+
+if RATE_LIMIT_BACKEND not in RATE_LIMIT_BACKENDS:
+    raise ValueError(f"Unknown rate limit backend: {RATE_LIMIT_BACKEND}")
+rate_limit_backend = RATE_LIMIT_BACKENDS[RATE_LIMIT_BACKEND]()
+
+# Metrics
+login_stats = {"throttled_ip": 0, "throttled_account": 0, "rejected_busy": 0}
+
+
+def client_ip(request: Request) -> str:
+    """Client address used for per-IP limits."""
+    if RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+    )
+
+
+async def throttle_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """
+    Dependency rate limiting login attempts per client IP and per account.
+    Runs before the users lookup, so throttled requests cost no database
+    round-trip or bcrypt work.
+    """
+    allowed, retry_after = await rate_limit_backend.take(
+        f"login:ip:{client_ip(request)}",
+        LOGIN_IP_BURST,
+        LOGIN_IP_PER_MINUTE / 60
+    )
+    if not allowed:
+        login_stats["throttled_ip"] += 1
+        raise too_many_requests("Too many login attempts. Please try again later.", retry_after)
+
+    allowed, retry_after = await rate_limit_backend.take(
+        f"login:account:{form_data.username.strip().lower()}",
+        LOGIN_ACCOUNT_BURST,
+        LOGIN_ACCOUNT_PER_MINUTE / 60
+    )
+    if not allowed:
+        login_stats["throttled_account"] += 1
+        raise too_many_requests("Too many login attempts for this account. Please try again later.", retry_after)
+
+
+async def verify_login_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a login password in the password pool, unless too many
+    verifications are already pending, in which case reject with a 429.
+    """
+    pending = password_executor.running + password_executor.queued
+    if pending >= LOGIN_MAX_PENDING_VERIFICATIONS:
+        login_stats["rejected_busy"] += 1
+        pool = password_executor.stats()
+        raise too_many_requests(
+            "Login service is busy. Please try again shortly.",
+            pool["avg_run_ms"] / 1000 * pending / password_executor.max_concurrency
+        )
+    return await verify_password_async(plain_password, hashed_password)
+
+
+def stats() -> dict:
+    return {
+        "backend": RATE_LIMIT_BACKEND,
+        "max_pending_verifications": LOGIN_MAX_PENDING_VERIFICATIONS,
+        **login_stats
+    }
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict
-from app.auth import get_current_admin
-from app.database import get_database
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Dict, Optional
+from app.auth import get_current_admin, token_cache
+from app.database import get_collection, pool_metrics
+from app import rate_limit, slow_query_log
+from app.executors import ml_executor, password_executor
 from app.services.issue_service import IssueService
+from app.services.duplicate_service import duplicate_cache
+from app.services.cluster_service import ClusterService
+from app.services.token_service import TokenService
 from datetime import datetime, timedelta
 from bson import ObjectId
 
@@ -10,34 +15,34 @@ router = APIRouter()
 
 @router.get("/dashboard")
 async def get_dashboard_stats(current_user: str = Depends(get_current_admin)):
-    """Get admin dashboard analytics"""
-    db = get_database()
+    """Get admin dashboard analytics (read from secondaries when available)"""
+    issues = get_collection("issues", "analytics")
     
     # Total issues
-    total_issues = await db.issues.count_documents({})
+    total_issues = await slow_query_log.count_documents(issues, {}, source="admin.dashboard")
     
     # Pending issues (not resolved/closed)
-    pending_issues = await db.issues.count_documents({
+    pending_issues = await slow_query_log.count_documents(issues, {
         "status": {"$nin": ["resolved", "closed"]}
-    })
+    }, source="admin.dashboard")
     
     # Resolved issues
-    resolved_issues = await db.issues.count_documents({
+    resolved_issues = await slow_query_log.count_documents(issues, {
         "status": {"$in": ["resolved", "closed"]}
-    })
+    }, source="admin.dashboard")
     
     # Category distribution
     category_pipeline = [
         {"$group": {"_id": "$category", "count": {"$sum": 1}}}
     ]
-    category_dist = await db.issues.aggregate(category_pipeline).to_list(length=20)
+    category_dist = await slow_query_log.aggregate(issues, category_pipeline, length=20, source="admin.dashboard")
     category_distribution = {item["_id"]: item["count"] for item in category_dist}
     
     # Priority distribution
     priority_pipeline = [
         {"$group": {"_id": "$priority", "count": {"$sum": 1}}}
     ]
-    priority_dist = await db.issues.aggregate(priority_pipeline).to_list(length=20)
+    priority_dist = await slow_query_log.aggregate(issues, priority_pipeline, length=20, source="admin.dashboard")
     priority_distribution = {item["_id"]: item["count"] for item in priority_dist}
     
     # Hostel/Block distribution
@@ -45,7 +50,7 @@ async def get_dashboard_stats(current_user: str = Depends(get_current_admin)):
         {"$match": {"hostel": {"$ne": None}}},
         {"$group": {"_id": "$hostel", "count": {"$sum": 1}}}
     ]
-    hostel_dist = await db.issues.aggregate(hostel_pipeline).to_list(length=20)
+    hostel_dist = await slow_query_log.aggregate(issues, hostel_pipeline, length=20, source="admin.dashboard")
     hostel_distribution = {item["_id"]: item["count"] for item in hostel_dist}
     
     # Block distribution
@@ -53,14 +58,14 @@ async def get_dashboard_stats(current_user: str = Depends(get_current_admin)):
         {"$match": {"block": {"$ne": None}}},
         {"$group": {"_id": "$block", "count": {"$sum": 1}}}
     ]
-    block_dist = await db.issues.aggregate(block_pipeline).to_list(length=20)
+    block_dist = await slow_query_log.aggregate(issues, block_pipeline, length=20, source="admin.dashboard")
     block_distribution = {item["_id"]: item["count"] for item in block_dist}
     
     # Average resolution time
-    resolved_issues_with_time = await db.issues.find({
+    resolved_issues_with_time = await slow_query_log.find(issues, {
         "status": {"$in": ["resolved", "closed"]},
         "resolved_at": {"$ne": None}
-    }).to_list(length=1000)
+    }, limit=1000, source="admin.dashboard")
     
     total_resolution_time = 0
     count_with_time = 0
@@ -81,15 +86,15 @@ async def get_dashboard_stats(current_user: str = Depends(get_current_admin)):
     
     # Recent issues (last 7 days)
     seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    recent_issues = await db.issues.count_documents({
+    recent_issues = await slow_query_log.count_documents(issues, {
         "created_at": {"$gte": seven_days_ago}
-    })
+    }, source="admin.dashboard")
     
     # Status distribution
     status_pipeline = [
         {"$group": {"_id": "$status", "count": {"$sum": 1}}}
     ]
-    status_dist = await db.issues.aggregate(status_pipeline).to_list(length=20)
+    status_dist = await slow_query_log.aggregate(issues, status_pipeline, length=20, source="admin.dashboard")
     status_distribution = {item["_id"]: item["count"] for item in status_dist}
     
     # Issue heatmap data (hostel/block density)
@@ -100,7 +105,7 @@ async def get_dashboard_stats(current_user: str = Depends(get_current_admin)):
             {"$match": {"hostel": hostel, "block": {"$ne": None}}},
             {"$group": {"_id": "$block", "count": {"$sum": 1}}}
         ]
-        blocks = await db.issues.aggregate(block_pipeline).to_list(length=20)
+        blocks = await slow_query_log.aggregate(issues, block_pipeline, length=20, source="admin.dashboard")
         for block in blocks:
             heatmap_data.append({
                 "hostel": hostel,
@@ -128,11 +133,11 @@ async def get_dashboard_stats(current_user: str = Depends(get_current_admin)):
 @router.get("/caretakers")
 async def get_caretakers(current_user: str = Depends(get_current_admin)):
     """Get list of caretakers for assignment"""
-    db = get_database()
+    users = get_collection("users", "analytics")
     
     # In a real system, you'd have a caretakers collection
     # For now, return a mock list or users with specific role
-    caretakers = await db.users.find({
+    caretakers = await users.find({
         "role": {"$in": ["admin", "caretaker"]}
     }).to_list(length=50)
     
@@ -150,27 +155,31 @@ async def get_caretakers(current_user: str = Depends(get_current_admin)):
 async def get_all_issues_admin(
     page: int = 1,
     limit: int = 50,
+    cursor: Optional[str] = None,
     current_user: str = Depends(get_current_admin)
 ):
-    """Get all issues for admin with pagination"""
-    result = await IssueService.get_issues(
-        user_email=current_user,
-        user_role="admin",
-        page=page,
-        limit=limit
-    )
-    return result
+    """Get all issues for admin, by page number or by following pagination.next_cursor"""
+    try:
+        return await IssueService.get_issues(
+            user_email=current_user,
+            user_role="admin",
+            page=page,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/delayed-issues")
 async def get_delayed_issues(current_user: str = Depends(get_current_admin)):
     """Get issues that exceed average resolution time"""
-    db = get_database()
+    issues = get_collection("issues", "analytics")
     
     # Calculate average resolution time
-    resolved_issues = await db.issues.find({
+    resolved_issues = await slow_query_log.find(issues, {
         "status": {"$in": ["resolved", "closed"]},
         "resolved_at": {"$ne": None}
-    }).to_list(length=1000)
+    }, limit=1000, source="admin.delayed_issues")
     
     total_time = 0
     count = 0
@@ -187,3 +196,57 @@ async def get_delayed_issues(current_user: str = Depends(get_current_admin)):
     
     delayed = await IssueService.get_delayed_issues(avg_hours)
     return {"delayed_issues": delayed, "average_resolution_hours": round(avg_hours, 2)}
+
+@router.get("/duplicate-clusters")
+async def get_duplicate_clusters(
+    hostel: Optional[str] = None,
+    block: Optional[str] = None,
+    category: Optional[str] = None,
+    min_size: int = 2,
+    limit: int = 50,
+    current_user: str = Depends(get_current_admin)
+):
+    """Get groups of open issues reported as likely duplicates (refreshed by a background job)"""
+    return await ClusterService.get_clusters(
+        hostel=hostel,
+        block=block,
+        category=category,
+        min_size=min_size,
+        limit=limit
+    )
+
+@router.post("/users/{email}/revoke-tokens")
+async def revoke_user_tokens(email: str, current_user: str = Depends(get_current_admin)):
+    """Sign a user out everywhere (use after changing their role or disabling the account)"""
+    token_version = await TokenService.revoke_tokens(email)
+    if token_version is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"email": email, "token_version": token_version}
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(20, ge=1, le=100),
+    hours: int = Query(24, ge=1, le=24 * 30),
+    current_user: str = Depends(get_current_admin)
+):
+    """Get the slowest recorded query shapes (values redacted) with their explain summaries"""
+    return {
+        "threshold_ms": slow_query_log.SLOW_QUERY_THRESHOLD_MS,
+        "shapes": await slow_query_log.worst_shapes(limit=limit, hours=hours)
+    }
+
+@router.get("/metrics")
+async def get_runtime_metrics(current_user: str = Depends(get_current_admin)):
+    """Get in-process runtime metrics (worker pools, MongoDB connection pool, caches)"""
+    return {
+        "executors": {
+            "ml": ml_executor.stats(),
+            "password": password_executor.stats()
+        },
+        "mongo_pool": pool_metrics.stats(),
+        "login_rate_limit": rate_limit.stats(),
+        "caches": {
+            "duplicate_check": duplicate_cache.stats(),
+            "jwt": token_cache.stats()
+        }
+    }
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List
 from app.models import AnnouncementCreate, AnnouncementResponse
-from app.auth import get_current_user, get_current_admin
+from app.auth import get_current_user, get_current_admin, get_current_user_doc
 from app.database import get_database
 from bson import ObjectId
 from datetime import datetime
@@ -12,18 +12,12 @@ router = APIRouter()
 @router.post("/", response_model=AnnouncementResponse, status_code=status.HTTP_201_CREATED)
 async def create_announcement(
     announcement_data: AnnouncementCreate,
-    current_user: str = Depends(get_current_admin)
+    current_user: str = Depends(get_current_admin),
+    user: dict = Depends(get_current_user_doc)
 ):
     """Create announcement (admin only)"""
     db = get_database()
 
-    user = await db.users.find_one({"email": current_user})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-
     announcement_doc = {
         "title": announcement_data.title,
         "content": announcement_data.content,
@@ -44,18 +38,11 @@ async def create_announcement(
 
 @router.get("/", response_model=List[AnnouncementResponse])
 async def get_announcements(
-    current_user: str = Depends(get_current_user)
+    user: dict = Depends(get_current_user_doc)
 ):
     """Get announcements filtered by user's hostel/block"""
     db = get_database()
 
-    user = await db.users.find_one({"email": current_user})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-
     query = {
         "$or": [
             {"target_hostel": None},
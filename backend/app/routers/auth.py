@@ -3,15 +3,15 @@ from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from app.models import User, UserResponse, Token, UserRole
 from app.auth import (
-    verify_password, 
-    get_password_hash, 
+    get_password_hash_async,
     create_access_token,
-    get_current_user,
+    get_current_user_doc,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from app.database import get_database
+from app.rate_limit import throttle_login, verify_login_password
+from app.services.user_service import UserService
 from bson import ObjectId
-from datetime import datetime
 
 router = APIRouter()
 
@@ -40,19 +40,10 @@ async def register(user_data: User):
         )
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
-    
-    # Create user document (defaults to student)
-    user_doc = {
-        "email": user_data.email,
-        "password": hashed_password,
-        "name": user_data.name,
-        "role": "student",  # Always student for regular registration
-        "hostel": user_data.hostel,
-        "block": user_data.block,
-        "room": user_data.room,
-        "created_at": datetime.utcnow()
-    }
+    hashed_password = await get_password_hash_async(user_data.password)
+    
+    # Create user document (always student for regular registration)
+    user_doc = UserService.build_user_document(user_data, hashed_password, role="student")
     
     result = await db.users.insert_one(user_doc)
     user_doc["id"] = str(result.inserted_id)
@@ -93,19 +84,10 @@ async def register_admin(
         )
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     
     # Create admin user document
-    user_doc = {
-        "email": user_data.email,
-        "password": hashed_password,
-        "name": user_data.name,
-        "role": "admin",
-        "hostel": user_data.hostel,
-        "block": user_data.block,
-        "room": user_data.room,
-        "created_at": datetime.utcnow()
-    }
+    user_doc = UserService.build_user_document(user_data, hashed_password, role="admin")
     
     result = await db.users.insert_one(user_doc)
     user_doc["id"] = str(result.inserted_id)
@@ -114,7 +96,7 @@ async def register_admin(
     
     return UserResponse(**user_doc)
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(throttle_login)])
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Generic login endpoint (deprecated - use role-specific endpoints).
@@ -123,7 +105,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     db = get_database()
     
     user = await db.users.find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user["password"]):
+    if not user or not await verify_login_password(form_data.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -135,12 +117,13 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     access_token = create_access_token(
         data={"sub": user["email"]}, 
         expires_delta=access_token_expires,
-        role=user_role
+        role=user_role,
+        token_version=user.get("token_version", 0)
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.post("/login/student", response_model=Token)
+@router.post("/login/student", response_model=Token, dependencies=[Depends(throttle_login)])
 async def login_student(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Student-specific login endpoint with role validation.
@@ -149,7 +132,7 @@ async def login_student(form_data: OAuth2PasswordRequestForm = Depends()):
     db = get_database()
     
     user = await db.users.find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user["password"]):
+    if not user or not await verify_login_password(form_data.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -167,12 +150,13 @@ async def login_student(form_data: OAuth2PasswordRequestForm = Depends()):
     access_token = create_access_token(
         data={"sub": user["email"]}, 
         expires_delta=access_token_expires,
-        role="student"
+        role="student",
+        token_version=user.get("token_version", 0)
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.post("/login/admin", response_model=Token)
+@router.post("/login/admin", response_model=Token, dependencies=[Depends(throttle_login)])
 async def login_admin(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Admin-specific login endpoint with role validation.
@@ -181,7 +165,7 @@ async def login_admin(form_data: OAuth2PasswordRequestForm = Depends()):
     db = get_database()
     
     user = await db.users.find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user["password"]):
+    if not user or not await verify_login_password(form_data.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -199,23 +183,15 @@ async def login_admin(form_data: OAuth2PasswordRequestForm = Depends()):
     access_token = create_access_token(
         data={"sub": user["email"]}, 
         expires_delta=access_token_expires,
-        role="admin"
+        role="admin",
+        token_version=user.get("token_version", 0)
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: str = Depends(get_current_user)):
-    db = get_database()
-    user = await db.users.find_one({"email": current_user})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
+async def get_current_user_info(user: dict = Depends(get_current_user_doc)):
     user["id"] = str(user["_id"])
     user.pop("_id", None)
-    user.pop("password", None)
     
     return UserResponse(**user)
@@ -2,13 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from typing import List, Optional
 from app.models import (
     IssueCreate, IssueUpdate, IssueResponse, CommentCreate,
-    DuplicateCheckResponse, IssueStatus
+    DuplicateCheckResponse, IssueStatus,
+    BatchDuplicateCheckRequest, BatchDuplicateCheckResponse
 )
-from app.auth import get_current_user, get_current_admin
+from app.auth import get_current_user, get_current_admin, get_current_user_doc, get_token_payload, get_token_role
 from app.database import get_database
-from app.ml_duplicate_detection import duplicate_detector
 from app.cloudinary_config import upload_image
 from app.services.issue_service import IssueService
+from app.services.duplicate_service import DuplicateService
 from bson import ObjectId
 from datetime import datetime
 
@@ -18,35 +19,59 @@ router = APIRouter()
 @router.post("/check-duplicate", response_model=DuplicateCheckResponse)
 async def check_duplicate_issue(
     issue_data: IssueCreate,
+    cross_partition: Optional[bool] = None,
     current_user: str = Depends(get_current_user)
 ):
-    """Check if issue is duplicate before creation"""
-    db = get_database()
+    """Check if issue is duplicate before creation (within the reporter's hostel/block/category)"""
+    result = await DuplicateService.check_duplicates_for_user(
+        issue_data.title,
+        issue_data.description,
+        user_email=current_user,
+        category=issue_data.category.value,
+        cross_partition=cross_partition
+    )
 
-    existing_issues = await db.issues.find({
-        "status": {"$ne": "closed"}
-    }).to_list(length=100)
+    return DuplicateCheckResponse(**result)
 
-    issue_text = f"{issue_data.title} {issue_data.description}"
-    result = duplicate_detector.detect_duplicates(issue_text, existing_issues)
 
-    return DuplicateCheckResponse(**result)
+@router.post("/check-duplicate/batch", response_model=BatchDuplicateCheckResponse)
+async def check_duplicate_issues_batch(
+    batch: BatchDuplicateCheckRequest,
+    payload: dict = Depends(get_token_payload)
+):
+    """
+    Check a batch of issues (e.g. a complaint register) for duplicates in one request.
+    Items are compared with existing issues and with each other within the
+    caller's own hostel/block; only admins may check another hostel/block.
+    """
+    hostel, block = await DuplicateService.reporter_location(payload["sub"])
+    if await get_token_role(payload) == "admin":
+        hostel, block = batch.hostel or hostel, batch.block or block
+    elif (batch.hostel and batch.hostel != hostel) or (batch.block and batch.block != block):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can check issues from another hostel or block"
+        )
+    result = await DuplicateService.check_duplicates_batch(
+        [
+            {"title": item.title, "description": item.description, "category": item.category.value}
+            for item in batch.issues
+        ],
+        hostel=hostel,
+        block=block
+    )
+
+    return BatchDuplicateCheckResponse(**result)
 
 
 @router.post("/", response_model=IssueResponse, status_code=status.HTTP_201_CREATED)
 async def create_issue(
     issue_data: IssueCreate,
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    user: dict = Depends(get_current_user_doc)
 ):
     db = get_database()
 
-    user = await db.users.find_one({"email": current_user})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-
     issue_doc = {
         "title": issue_data.title,
         "description": issue_data.description,
@@ -66,12 +91,14 @@ async def create_issue(
         "reactions": {},
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
-        "resolved_at": None
+        "resolved_at": None,
+        **DuplicateService.search_fields(issue_data.title, issue_data.description)
     }
 
     result = await db.issues.insert_one(issue_doc)
     issue_doc["id"] = str(result.inserted_id)
     issue_doc.pop("_id", None)
+    DuplicateService.index_issue(issue_doc)
 
     return IssueResponse(**issue_doc)
 
@@ -100,22 +127,25 @@ async def get_issues(
     search: Optional[str] = None,
     page: int = 1,
     limit: int = 20,
-    current_user: str = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    current_user: str = Depends(get_current_user),
+    user: dict = Depends(get_current_user_doc)
 ):
-    db = get_database()
-    user = await db.users.find_one({"email": current_user})
-    user_role = user.get("role", "student") if user else "student"
-
-    result = await IssueService.get_issues(
-        user_email=current_user,
-        user_role=user_role,
-        status_filter=status_filter,
-        category=category,
-        priority=priority,
-        search=search,
-        page=page,
-        limit=limit
-    )
+    """List issues by page number, or by following pagination.next_cursor"""
+    try:
+        result = await IssueService.get_issues(
+            user_email=current_user,
+            user_role=user.get("role", "student"),
+            status_filter=status_filter,
+            category=category,
+            priority=priority,
+            search=search,
+            page=page,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     issues_response = [IssueResponse(**issue) for issue in result["issues"]]
 
@@ -128,7 +158,8 @@ async def get_issues(
 @router.get("/{issue_id}", response_model=IssueResponse)
 async def get_issue(
     issue_id: str,
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    user: dict = Depends(get_current_user_doc)
 ):
     db = get_database()
 
@@ -145,7 +176,6 @@ async def get_issue(
             detail="Issue not found"
         )
 
-    user = await db.users.find_one({"email": current_user})
     if user.get("role") != "admin" and issue["created_by"] != current_user and not issue.get("is_public"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -201,6 +231,7 @@ async def update_issue(
     updated_issue = await db.issues.find_one({"_id": ObjectId(issue_id)})
     updated_issue["id"] = str(updated_issue["_id"])
     updated_issue.pop("_id", None)
+    DuplicateService.index_issue(updated_issue)
 
     return IssueResponse(**updated_issue)
 
@@ -208,7 +239,8 @@ async def update_issue(
 @router.delete("/{issue_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_issue(
     issue_id: str,
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    user: dict = Depends(get_current_user_doc)
 ):
     """Delete issue: admin can delete any, student only their own"""
     db = get_database()
@@ -226,11 +258,10 @@ async def delete_issue(
             detail="Issue not found"
         )
 
-    user = await db.users.find_one({"email": current_user})
-
     # Admin can delete any issue
     if user.get("role") == "admin":
         await db.issues.delete_one({"_id": ObjectId(issue_id)})
+        DuplicateService.remove_issue(issue_id)
         return
 
     # Student can delete only their own issue
@@ -241,6 +272,7 @@ async def delete_issue(
         )
 
     await db.issues.delete_one({"_id": ObjectId(issue_id)})
+    DuplicateService.remove_issue(issue_id)
     return
 
 
@@ -248,7 +280,8 @@ async def delete_issue(
 async def add_comment(
     issue_id: str,
     comment_data: CommentCreate,
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    user: dict = Depends(get_current_user_doc)
 ):
     db = get_database()
 
@@ -265,7 +298,6 @@ async def add_comment(
             detail="Issue not found"
         )
 
-    user = await db.users.find_one({"email": current_user})
     if user.get("role") != "admin" and issue["created_by"] != current_user and not issue.get("is_public"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from typing import List
 from app.models import LostFoundCreate, LostFoundResponse
-from app.auth import get_current_user, get_current_admin
+from app.auth import get_current_user, get_current_admin, get_current_user_doc
 from app.database import get_database
 from app.cloudinary_config import upload_image
 from bson import ObjectId
@@ -13,18 +13,12 @@ router = APIRouter()
 @router.post("/", response_model=LostFoundResponse, status_code=status.HTTP_201_CREATED)
 async def create_lost_found(
     item_data: LostFoundCreate,
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    user: dict = Depends(get_current_user_doc)
 ):
     """Create lost or found item"""
     db = get_database()
 
-    user = await db.users.find_one({"email": current_user})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-
     item_doc = {
         "item_name": item_data.item_name,
         "description": item_data.description,
@@ -181,7 +175,8 @@ async def approve_claim(
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_lost_found_item(
     item_id: str,
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    user: dict = Depends(get_current_user_doc)
 ):
     """
     Delete lost/found item:
@@ -203,8 +198,6 @@ async def delete_lost_found_item(
             detail="Item not found"
         )
 
-    user = await db.users.find_one({"email": current_user})
-
     # Admin can delete anything
     if user.get("role") == "admin":
         await db.lost_found.delete_one({"_id": ObjectId(item_id)})
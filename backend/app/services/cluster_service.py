@@ -0,0 +1,171 @@
+"""
+Duplicate clustering service.
+Periodically groups open issues into clusters of likely duplicates and
+writes the cluster ids back to the issues, so admin views read precomputed
+results instead of clustering on every request.
+"""
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+from app.database import get_collection, get_database
+from app.executors import ml_executor
+from app.services.duplicate_service import DuplicateService
+from bson import ObjectId
+from pymongo import UpdateMany
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DUPLICATE_CLUSTER_INTERVAL_SECONDS = int(os.getenv("DUPLICATE_CLUSTER_INTERVAL_SECONDS", "900"))
+# Similarity linking two issues into the same cluster (same as the detection threshold by default)
+DUPLICATE_CLUSTER_THRESHOLD = float(os.getenv("DUPLICATE_CLUSTER_THRESHOLD", "0.7"))
+
+CLUSTER_JOB = "duplicate_clustering"
+# Identifies this API worker when taking the job lock
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _object_ids(issue_ids: List[str]) -> list:
+    return [ObjectId(i) if ObjectId.is_valid(i) else i for i in issue_ids]
+
+
+class ClusterService:
+    """Service class for duplicate clustering of open issues."""
+
+    @staticmethod
+    async def acquire_lock(job: str, ttl_seconds: int) -> bool:
+        """
+        Take a lease on a background job so only one API worker runs it.
+        The lease expires on its own if the holder dies.
+
+        Args:
+            job: Job name
+            ttl_seconds: Lease length
+
+        Returns:
+            True if this worker holds the lease
+        """
+        db = get_database()
+        now = datetime.utcnow()
+        try:
+            await db.job_locks.find_one_and_update(
+                {
+                    "_id": job,
+                    "$or": [{"expires_at": {"$lte": now}}, {"owner": WORKER_ID}]
+                },
+                {"$set": {"owner": WORKER_ID, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Lock document exists and is held by another worker
+            return False
+        return True
+
+    @staticmethod
+    async def cluster_open_issues(threshold: Optional[float] = None) -> dict:
+        """
+        Cluster all open issues and store the result.
+
+        Cluster ids and sizes are written to the member issues; issues that
+        are no longer in any cluster have the fields removed. Cluster
+        summaries replace the previous run in the duplicate_clusters collection.
+
+        Args:
+            threshold: Similarity linking two issues (defaults to DUPLICATE_CLUSTER_THRESHOLD)
+
+        Returns:
+            Run summary with run_id, cluster and issue counts
+        """
+        db = get_database()
+        threshold = DUPLICATE_CLUSTER_THRESHOLD if threshold is None else threshold
+        detector = await DuplicateService.ensure_ready()
+        clusters = await ml_executor.run(detector.cluster_issues, threshold)
+
+        run_id = uuid.uuid4().hex
+        generated_at = datetime.utcnow()
+        if clusters:
+            await db.issues.bulk_write([
+                UpdateMany(
+                    {"_id": {"$in": _object_ids(cluster["issue_ids"])}},
+                    {"$set": {
+                        "duplicate_cluster_id": cluster["cluster_id"],
+                        "duplicate_cluster_size": cluster["size"],
+                        "duplicate_cluster_run": run_id
+                    }}
+                )
+                for cluster in clusters
+            ], ordered=False)
+            await db.duplicate_clusters.insert_many([
+                {**cluster, "run_id": run_id, "threshold": threshold, "generated_at": generated_at}
+                for cluster in clusters
+            ])
+        await db.issues.update_many(
+            {"duplicate_cluster_run": {"$exists": True, "$ne": run_id}},
+            {"$unset": {"duplicate_cluster_id": "", "duplicate_cluster_size": "", "duplicate_cluster_run": ""}}
+        )
+        await db.duplicate_clusters.delete_many({"run_id": {"$ne": run_id}})
+
+        return {
+            "run_id": run_id,
+            "generated_at": generated_at,
+            "clusters": len(clusters),
+            "clustered_issues": sum(cluster["size"] for cluster in clusters)
+        }
+
+    @staticmethod
+    async def get_clusters(
+        hostel: Optional[str] = None,
+        block: Optional[str] = None,
+        category: Optional[str] = None,
+        min_size: int = 2,
+        limit: int = 50
+    ) -> dict:
+        """
+        Get the latest stored duplicate clusters, largest first.
+
+        Args:
+            hostel: Filter by hostel
+            block: Filter by block
+            category: Filter by category
+            min_size: Smallest cluster to return
+            limit: Maximum number of clusters
+
+        Returns:
+            Clusters and the time they were generated
+        """
+        clusters_collection = get_collection("duplicate_clusters", "analytics")
+        query = {"size": {"$gte": min_size}}
+        if hostel:
+            query["hostel"] = hostel
+        if block:
+            query["block"] = block
+        if category:
+            query["category"] = category
+
+        clusters = await clusters_collection.find(query).sort(
+            [("size", -1), ("cluster_id", 1)]
+        ).limit(limit).to_list(length=limit)
+        for cluster in clusters:
+            cluster.pop("_id", None)
+
+        return {
+            "clusters": clusters,
+            "generated_at": clusters[0]["generated_at"] if clusters else None
+        }
+
+    @staticmethod
+    async def cluster_periodically(interval: Optional[int] = None) -> None:
+        """Re-cluster open issues on a fixed interval until cancelled."""
+        interval = interval or DUPLICATE_CLUSTER_INTERVAL_SECONDS
+        while True:
+            try:
+                if await ClusterService.acquire_lock(CLUSTER_JOB, interval):
+                    summary = await ClusterService.cluster_open_issues()
+                    print(f"✅ Duplicate clustering: {summary['clusters']} clusters, {summary['clustered_issues']} issues")
+            except Exception as e:
+                print(f"Error clustering duplicate issues: {e}")
+            await asyncio.sleep(interval)
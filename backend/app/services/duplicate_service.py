@@ -0,0 +1,385 @@
+"""
+Duplicate index service.
+Keeps the in-memory duplicate detection index in step with the issues collection.
+
+The ML stack (scikit-learn, SciPy, NumPy) is imported lazily through
+get_detector(), so the API starts serving before it is loaded; warm_up()
+loads it and builds the index in the background after startup.
+
+Issue writes queue their index updates; a background task applies them in
+order on the ML executor, so the event loop never waits on the index lock.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from app import text_processing
+from app.cache import LRUTTLCache
+from app.database import get_database
+from app.executors import ml_executor
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from app.ml_duplicate_detection import DuplicateDetector
+
+load_dotenv()
+
+# Full rebuild interval; picks up writes made by other API workers
+DUPLICATE_INDEX_REFRESH_SECONDS = int(os.getenv("DUPLICATE_INDEX_REFRESH_SECONDS", "300"))
+# Search other hostels/blocks/categories when the reporter's own partition has no match
+DUPLICATE_CROSS_PARTITION_FALLBACK = os.getenv("DUPLICATE_CROSS_PARTITION_FALLBACK", "false").lower() == "true"
+# On-disk index snapshots let restarted workers skip the full rebuild (disabled when empty)
+DUPLICATE_INDEX_SNAPSHOT_DIR = os.getenv("DUPLICATE_INDEX_SNAPSHOT_DIR", "")
+# Snapshots older than this are ignored at startup
+DUPLICATE_INDEX_SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("DUPLICATE_INDEX_SNAPSHOT_MAX_AGE_SECONDS", "86400"))
+
+INDEX_PROJECTION = {
+    "title": 1, "description": 1, "status": 1,
+    "hostel": 1, "block": 1, "category": 1, "search_tokens": 1
+}
+
+# Check results keyed by normalized text, partition and index version
+duplicate_cache = LRUTTLCache(
+    maxsize=int(os.getenv("DUPLICATE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("DUPLICATE_CACHE_TTL_SECONDS", "60"))
+)
+# Reporter email -> (hostel, block), so repeated checks skip the users lookup
+reporter_cache = LRUTTLCache(maxsize=4096, ttl=float(os.getenv("DUPLICATE_CACHE_TTL_SECONDS", "60")))
+
+# Writes applied while a rebuild is loading from Mongo, replayed onto the new index
+_rebuild_journal: Optional[list] = None
+# Index updates waiting for the flush task: ("index_issue", issue) or ("remove_issue", issue id)
+_pending_updates: list = []
+_flush_task: Optional[asyncio.Task] = None
+# Serializes flushes with index swaps, so updates are never applied out of order
+_update_lock = asyncio.Lock()
+
+_detector: Optional["DuplicateDetector"] = None
+_warm_up: Optional[asyncio.Task] = None
+
+
+def get_detector() -> "DuplicateDetector":
+    """
+    Shared DuplicateDetector, importing the ML stack on first call.
+    The first call blocks for the import, so call it from a worker thread
+    (see load_detector()) unless the detector is already loaded.
+    """
+    global _detector
+    if _detector is None:
+        from app.ml_duplicate_detection import duplicate_detector
+        _detector = duplicate_detector
+    return _detector
+
+
+async def load_detector() -> "DuplicateDetector":
+    """Load the ML stack in the ML thread pool without blocking the event loop."""
+    if _detector is None:
+        await ml_executor.run(get_detector)
+    return _detector
+
+
+class DuplicateService:
+    """Service class for duplicate index maintenance and lookups."""
+
+    @staticmethod
+    async def build_index() -> int:
+        """
+        Rebuild the duplicate index from all open issues.
+
+        Returns:
+            Number of indexed issues
+        """
+        global _rebuild_journal
+        db = get_database()
+        detector = await load_detector()
+        _rebuild_journal = []
+        source_time = datetime.utcnow()
+        try:
+            issues = await db.issues.find(
+                {"status": {"$ne": "closed"}},
+                INDEX_PROJECTION
+            ).to_list(length=None)
+            index = await ml_executor.run(detector.build, issues)
+            async with _update_lock:
+                # Updates still queued were journaled too; re-applying them after the swap is harmless
+                journal, _rebuild_journal = _rebuild_journal, None
+                await ml_executor.run(detector.use_index, index, journal)
+        finally:
+            _rebuild_journal = None
+        duplicate_cache.clear()
+        await DuplicateService.save_snapshot(source_time)
+        return len(index)
+
+    @staticmethod
+    async def save_snapshot(source_time: datetime) -> None:
+        """
+        Write the index to DUPLICATE_INDEX_SNAPSHOT_DIR, unless snapshots are
+        disabled or another worker wrote a fresh one in the last half refresh interval.
+        """
+        if not DUPLICATE_INDEX_SNAPSHOT_DIR:
+            return
+        detector = await load_detector()
+        current = detector.snapshot_manifest(DUPLICATE_INDEX_SNAPSHOT_DIR)
+        if current and current.get("source_time"):
+            age = source_time - datetime.fromisoformat(current["source_time"])
+            if age < timedelta(seconds=DUPLICATE_INDEX_REFRESH_SECONDS / 2):
+                return
+        try:
+            await ml_executor.run(
+                detector.save_snapshot,
+                DUPLICATE_INDEX_SNAPSHOT_DIR,
+                source_time
+            )
+        except OSError as e:
+            print(f"Error saving duplicate index snapshot: {e}")
+
+    @staticmethod
+    async def load_or_build_index() -> Tuple[int, str]:
+        """
+        Load the duplicate index from the latest on-disk snapshot and apply
+        issues changed since it was taken; fall back to a full rebuild when
+        there is no recent snapshot. Deletions made after the snapshot are
+        picked up by the next periodic rebuild.
+
+        Returns:
+            Tuple of (number of indexed issues, "snapshot" or "rebuild")
+        """
+        if DUPLICATE_INDEX_SNAPSHOT_DIR:
+            detector = await load_detector()
+            manifest = detector.snapshot_manifest(DUPLICATE_INDEX_SNAPSHOT_DIR)
+            source_time = manifest and manifest.get("source_time")
+            if source_time and datetime.utcnow() - datetime.fromisoformat(source_time) < timedelta(
+                seconds=DUPLICATE_INDEX_SNAPSHOT_MAX_AGE_SECONDS
+            ):
+                loaded = await ml_executor.run(detector.load_snapshot, DUPLICATE_INDEX_SNAPSHOT_DIR)
+                if loaded:
+                    db = get_database()
+                    changed = await db.issues.find(
+                        {"updated_at": {"$gte": datetime.fromisoformat(loaded["source_time"])}},
+                        INDEX_PROJECTION
+                    ).to_list(length=None)
+                    async with _update_lock:
+                        await ml_executor.run(
+                            detector.apply_updates,
+                            [("index_issue", issue) for issue in changed]
+                        )
+                    duplicate_cache.clear()
+                    return len(detector.index), "snapshot"
+        return await DuplicateService.build_index(), "rebuild"
+
+    @staticmethod
+    async def warm_up() -> int:
+        """
+        Load the ML stack and the duplicate index (snapshot or full rebuild).
+
+        Returns:
+            Number of indexed issues
+        """
+        started = time.perf_counter()
+        await load_detector()
+        loaded = time.perf_counter()
+        indexed, source = await DuplicateService.load_or_build_index()
+        print(
+            f"✅ Duplicate index ready from {source} ({indexed} open issues): "
+            f"ML import {loaded - started:.1f}s, index {time.perf_counter() - loaded:.1f}s"
+        )
+        return indexed
+
+    @staticmethod
+    def start_warm_up() -> asyncio.Task:
+        """Start warm_up() in the background (again, if a previous attempt failed)."""
+        global _warm_up
+        if _warm_up is None or (_warm_up.done() and (_warm_up.cancelled() or _warm_up.exception())):
+            _warm_up = asyncio.create_task(DuplicateService.warm_up())
+        return _warm_up
+
+    @staticmethod
+    async def ensure_ready() -> "DuplicateDetector":
+        """Wait until the detector is loaded and the initial index is built."""
+        await asyncio.shield(DuplicateService.start_warm_up())
+        return _detector
+
+    @staticmethod
+    def search_fields(title: str, description: str) -> dict:
+        """Normalized search_text/search_tokens to store on an issue document."""
+        return text_processing.search_fields(title, description)
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Normalize a search query the same way search_text is stored."""
+        return text_processing.preprocess_text(text)
+
+    @staticmethod
+    def _queue_update(method: str, arg) -> None:
+        global _flush_task
+        duplicate_cache.clear()
+        if _rebuild_journal is not None:
+            _rebuild_journal.append((method, arg))
+        if _detector is None:
+            # The pending warm-up build reads the change from Mongo
+            return
+        _pending_updates.append((method, arg))
+        if _flush_task is None or _flush_task.done():
+            _flush_task = asyncio.create_task(DuplicateService._flush_updates())
+
+    @staticmethod
+    async def _flush_updates() -> None:
+        """Apply queued index updates in order, in batches, until the queue is empty."""
+        global _pending_updates
+        while _pending_updates:
+            updates, _pending_updates = _pending_updates, []
+            try:
+                async with _update_lock:
+                    await ml_executor.run(_detector.apply_updates, updates)
+            except Exception as e:
+                # The next periodic rebuild picks the changes up from Mongo
+                print(f"Error applying {len(updates)} duplicate index updates: {e}")
+
+    @staticmethod
+    async def wait_for_updates() -> None:
+        """Wait until index updates queued so far are applied."""
+        if _flush_task is not None and not _flush_task.done():
+            await asyncio.shield(_flush_task)
+
+    @staticmethod
+    def index_issue(issue: dict) -> None:
+        """
+        Queue a created or updated issue for the index. Before the ML stack is
+        loaded this is a no-op: the pending warm-up build reads the issue from Mongo.
+        """
+        DuplicateService._queue_update("index_issue", issue)
+
+    @staticmethod
+    def remove_issue(issue_id: str) -> None:
+        """Queue a deleted issue for removal from the index."""
+        DuplicateService._queue_update("remove_issue", issue_id)
+
+    @staticmethod
+    async def check_duplicates(
+        title: str,
+        description: str,
+        hostel: Optional[str] = None,
+        block: Optional[str] = None,
+        category: Optional[str] = None,
+        cross_partition: Optional[bool] = None
+    ) -> dict:
+        """
+        Check an issue draft against the duplicate index.
+        When a category is given, only issues from the same hostel, block and
+        category are compared.
+
+        Args:
+            title: Issue title
+            description: Issue description
+            hostel: Reporter's hostel
+            block: Reporter's block
+            category: Issue category
+            cross_partition: Fall back to other partitions when nothing
+                matches (defaults to DUPLICATE_CROSS_PARTITION_FALLBACK)
+
+        Returns:
+            Duplicate detection results with similarity scores
+        """
+        issue_text = f"{title} {description}"
+        partition = (hostel, block, category) if category else None
+        if cross_partition is None:
+            cross_partition = DUPLICATE_CROSS_PARTITION_FALLBACK
+
+        detector = await DuplicateService.ensure_ready()
+        # Reporters see their own just-submitted issues
+        await DuplicateService.wait_for_updates()
+        normalized = text_processing.preprocess_text(issue_text)
+        cache_key = (
+            hashlib.sha256(normalized.encode()).hexdigest(),
+            partition,
+            cross_partition,
+            detector.index_version
+        )
+        result = duplicate_cache.get(cache_key)
+        if result is not None:
+            return result
+
+        result = await ml_executor.run(
+            detector.detect_duplicates,
+            issue_text,
+            partition=partition,
+            cross_partition=cross_partition
+        )
+        duplicate_cache.set(cache_key, result)
+        return result
+
+    @staticmethod
+    async def reporter_location(user_email: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Reporter's (hostel, block), cached briefly so repeated checks while a
+        draft is edited are served without touching Mongo.
+        """
+        location = reporter_cache.get(user_email)
+        if location is None:
+            db = get_database()
+            user = await db.users.find_one(
+                {"email": user_email},
+                {"hostel": 1, "block": 1}
+            ) or {}
+            location = (user.get("hostel"), user.get("block"))
+            reporter_cache.set(user_email, location)
+        return location
+
+    @staticmethod
+    async def check_duplicates_for_user(
+        title: str,
+        description: str,
+        user_email: str,
+        category: Optional[str] = None,
+        cross_partition: Optional[bool] = None
+    ) -> dict:
+        """Check an issue draft within the reporter's hostel/block partition."""
+        hostel, block = await DuplicateService.reporter_location(user_email)
+        return await DuplicateService.check_duplicates(
+            title,
+            description,
+            hostel=hostel,
+            block=block,
+            category=category,
+            cross_partition=cross_partition
+        )
+
+    @staticmethod
+    async def check_duplicates_batch(
+        issues: List[dict],
+        hostel: Optional[str] = None,
+        block: Optional[str] = None
+    ) -> dict:
+        """
+        Check many issue drafts at once, against the index and each other.
+
+        Args:
+            issues: Drafts with 'title', 'description' and 'category'
+            hostel: Hostel the drafts were reported in
+            block: Block the drafts were reported in
+
+        Returns:
+            Per-item duplicate results and within-batch duplicate groups
+        """
+        texts = [f"{issue['title']} {issue['description']}" for issue in issues]
+        partitions = [(hostel, block, issue.get("category")) for issue in issues]
+        detector = await DuplicateService.ensure_ready()
+        await DuplicateService.wait_for_updates()
+        return await ml_executor.run(
+            detector.detect_duplicates_batch,
+            texts,
+            partitions=partitions
+        )
+
+    @staticmethod
+    async def refresh_periodically(interval: Optional[int] = None) -> None:
+        """Rebuild the index on a fixed interval until cancelled."""
+        interval = interval or DUPLICATE_INDEX_REFRESH_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await DuplicateService.build_index()
+            except Exception as e:
+                print(f"Error refreshing duplicate index: {e}")
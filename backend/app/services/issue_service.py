@@ -2,12 +2,49 @@
 Issue service layer for business logic separation.
 Handles all issue-related operations and validations.
 """
+import base64
+import json
+import re
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
-from app.database import get_database
-from app.ml_duplicate_detection import duplicate_detector
+from app import slow_query_log
+from app.database import get_collection, get_database
+from app.services.duplicate_service import DuplicateService
 from bson import ObjectId
 
+# Write-time search fields are internal and not returned to clients
+LIST_PROJECTION = {"search_text": 0, "search_tokens": 0}
+# Newest first; _id breaks created_at ties so keyset cursors are exact
+LIST_SORT = [("created_at", -1), ("_id", -1)]
+EPOCH = datetime(1970, 1, 1)
+
+
+def _encode_cursor(issue: dict) -> str:
+    """Opaque cursor pointing just past an issue in LIST_SORT order."""
+    created_ms = (issue["created_at"] - EPOCH) // timedelta(milliseconds=1)
+    payload = json.dumps({"c": created_ms, "i": str(issue["_id"])}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> dict:
+    """
+    Keyset filter for the issues after a cursor: created_at at or before the
+    cursor's (an index range), minus the ties already returned.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        created_at = EPOCH + timedelta(milliseconds=int(payload["c"]))
+        issue_id = ObjectId(payload["i"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return {
+        "created_at": {"$lte": created_at},
+        "$nor": [{"created_at": created_at, "_id": {"$gte": issue_id}}]
+    }
+
 
 class IssueService:
     """Service class for issue management operations."""
@@ -48,35 +85,48 @@ class IssueService:
             "reactions": {},
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
-            "resolved_at": None
+            "resolved_at": None,
+            **DuplicateService.search_fields(
+                issue_data.get("title") or "",
+                issue_data.get("description") or ""
+            )
         }
         
         result = await db.issues.insert_one(issue_doc)
         issue_doc["id"] = str(result.inserted_id)
         issue_doc.pop("_id", None)
+        DuplicateService.index_issue(issue_doc)
         return issue_doc
     
     @staticmethod
-    async def check_duplicates(title: str, description: str) -> dict:
+    async def check_duplicates(
+        title: str,
+        description: str,
+        user_email: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> dict:
         """
         Check for duplicate issues using ML/NLP.
+        Compares against the reporter's hostel/block/category partition
+        when the user and category are known.
         
         Args:
             title: Issue title
             description: Issue description
+            user_email: Email of the reporting user
+            category: Issue category
         
         Returns:
             Duplicate detection results with similarity scores
         """
-        db = get_database()
-        existing_issues = await db.issues.find({
-            "status": {"$ne": "closed"}
-        }).to_list(length=100)
-        
-        issue_text = f"{title} {description}"
-        result = duplicate_detector.detect_duplicates(issue_text, existing_issues)
-        
-        return result
+        if user_email:
+            return await DuplicateService.check_duplicates_for_user(
+                title,
+                description,
+                user_email=user_email,
+                category=category
+            )
+        return await DuplicateService.check_duplicates(title, description, category=category)
     
     @staticmethod
     async def get_issues(
@@ -87,11 +137,17 @@ class IssueService:
         priority: Optional[str] = None,
         search: Optional[str] = None,
         page: int = 1,
-        limit: int = 20
+        limit: int = 20,
+        cursor: Optional[str] = None
     ) -> Dict:
         """
         Get paginated list of issues with filtering and search.
         
+        Pages are either numbered (page/limit, with totals) or follow the
+        next_cursor of the previous page. Cursor pages seek on
+        (created_at, _id) instead of skipping, so every page costs the same
+        and new issues do not shift later pages; they skip the total count.
+        
         Args:
             user_email: Current user email
             user_role: Current user role
@@ -101,9 +157,13 @@ class IssueService:
             search: Search query
             page: Page number (1-indexed)
             limit: Items per page
+            cursor: next_cursor from the previous page (page is then ignored)
         
         Returns:
             Dictionary with issues list and pagination metadata
+        
+        Raises:
+            ValueError: If the cursor is malformed
         """
         db = get_database()
         query = {}
@@ -125,35 +185,64 @@ class IssueService:
         if priority:
             query["priority"] = priority
         
-        # Text search
+        # Text search over the normalized search_text stored at write time
         if search:
-            query["$or"] = [
-                {"title": {"$regex": search, "$options": "i"}},
-                {"description": {"$regex": search, "$options": "i"}}
-            ]
-            if user_role != "admin":
-                # Maintain access control with search
-                query = {
-                    "$and": [
-                        query,
+            normalized = DuplicateService.normalize_text(search)
+            if normalized:
+                pattern = re.escape(search.strip())
+                query["$and"] = [{
+                    "$or": [
+                        {"search_text": {"$regex": re.escape(normalized)}},
+                        # Issues written before search_text existed, until backfill_search_text.py runs
                         {
+                            "search_text": {"$exists": False},
                             "$or": [
-                                {"is_public": True},
-                                {"created_by": user_email}
+                                {"title": {"$regex": pattern, "$options": "i"}},
+                                {"description": {"$regex": pattern, "$options": "i"}}
                             ]
                         }
                     ]
-                }
-        
-        # Count total matching documents
-        total = await db.issues.count_documents(query)
-        
-        # Calculate pagination
-        skip = (page - 1) * limit
-        total_pages = (total + limit - 1) // limit
-        
-        # Fetch paginated results
-        issues = await db.issues.find(query).sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
+                }]
+        
+        if cursor:
+            query.update(_decode_cursor(cursor))
+            # One extra issue tells whether another page follows
+            issues = await slow_query_log.find(
+                db.issues, query, LIST_PROJECTION,
+                sort=LIST_SORT, limit=limit + 1,
+                source="IssueService.get_issues"
+            )
+            has_next = len(issues) > limit
+            issues = issues[:limit]
+            pagination = {
+                "limit": limit,
+                "has_next": has_next,
+                "next_cursor": _encode_cursor(issues[-1]) if has_next else None
+            }
+        else:
+            # Count total matching documents
+            total = await slow_query_log.count_documents(db.issues, query, source="IssueService.get_issues")
+            
+            # Calculate pagination
+            skip = (page - 1) * limit
+            total_pages = (total + limit - 1) // limit
+            
+            # Fetch paginated results
+            issues = await slow_query_log.find(
+                db.issues, query, LIST_PROJECTION,
+                sort=LIST_SORT, skip=skip, limit=limit,
+                source="IssueService.get_issues"
+            )
+            pagination = {
+                "page": page,
+                "limit": limit,
+                "total": total,
+                "total_pages": total_pages,
+                "has_next": page < total_pages,
+                "has_prev": page > 1,
+                # Switch to cursor pages from here on
+                "next_cursor": _encode_cursor(issues[-1]) if issues and page < total_pages else None
+            }
         
         # Format results
         result = []
@@ -164,14 +253,7 @@ class IssueService:
         
         return {
             "issues": result,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": total,
-                "total_pages": total_pages,
-                "has_next": page < total_pages,
-                "has_prev": page > 1
-            }
+            "pagination": pagination
         }
     
     @staticmethod
@@ -242,16 +324,17 @@ class IssueService:
         Returns:
             List of delayed issues
         """
-        db = get_database()
+        # Admin analytics: may be served by a secondary
+        issues = get_collection("issues", "analytics")
         now = datetime.utcnow()
         
         # Find issues that are still open and exceed average resolution time
         threshold_time = now - timedelta(hours=avg_resolution_hours)
         
-        delayed_issues = await db.issues.find({
+        delayed_issues = await slow_query_log.find(issues, {
             "status": {"$nin": ["resolved", "closed"]},
             "created_at": {"$lt": threshold_time}
-        }).to_list(length=100)
+        }, LIST_PROJECTION, limit=100, source="IssueService.get_delayed_issues")
         
         result = []
         for issue in delayed_issues:
@@ -0,0 +1,83 @@
+"""
+Token revocation service.
+Access tokens carry the user's role and token version as signed claims, so
+role guards authorize without a users lookup. Revoking a user's tokens (after
+a role change or when the account is disabled) bumps users.token_version;
+every worker keeps the bumped versions in memory and refreshes them
+periodically, rejecting tokens issued with an older version.
+"""
+import asyncio
+import os
+from typing import Dict, Optional
+from app.database import get_database
+from pymongo import ReturnDocument
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# How quickly a revocation made on one API worker reaches the others
+TOKEN_VERSION_REFRESH_SECONDS = int(os.getenv("TOKEN_VERSION_REFRESH_SECONDS", "30"))
+
+# email -> current token version, only for users whose tokens were ever revoked
+_token_versions: Dict[str, int] = {}
+
+
+class TokenService:
+    """Service class for access token revocation."""
+
+    @staticmethod
+    async def refresh() -> int:
+        """
+        Reload the token versions of users whose tokens were revoked.
+
+        Returns:
+            Number of users with revoked tokens
+        """
+        global _token_versions
+        db = get_database()
+        users = await db.users.find(
+            {"token_version": {"$gt": 0}},
+            {"email": 1, "token_version": 1}
+        ).to_list(length=None)
+        _token_versions = {user["email"]: user["token_version"] for user in users}
+        return len(_token_versions)
+
+    @staticmethod
+    def is_revoked(email: str, token_version: int) -> bool:
+        """Whether a token issued with token_version has since been revoked."""
+        return token_version < _token_versions.get(email, 0)
+
+    @staticmethod
+    async def revoke_tokens(email: str) -> Optional[int]:
+        """
+        Invalidate every token issued to a user so far. Call after changing
+        a user's role or disabling the account; the user has to log in again.
+
+        Args:
+            email: User email
+
+        Returns:
+            New token version, or None if the user does not exist
+        """
+        db = get_database()
+        user = await db.users.find_one_and_update(
+            {"email": email},
+            {"$inc": {"token_version": 1}},
+            projection={"token_version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not user:
+            return None
+        _token_versions[email] = user["token_version"]
+        return user["token_version"]
+
+    @staticmethod
+    async def refresh_periodically(interval: Optional[int] = None) -> None:
+        """Reload revoked token versions on a fixed interval until cancelled."""
+        interval = interval or TOKEN_VERSION_REFRESH_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await TokenService.refresh()
+            except Exception as e:
+                print(f"Error refreshing token versions: {e}")
@@ -0,0 +1,42 @@
+"""
+User service layer.
+Builds user documents the same way for self-registration, admin
+registration and bulk imports.
+"""
+from datetime import datetime
+from typing import Optional
+from app.models import User
+
+
+class UserService:
+    """Service class for user account documents."""
+
+    @staticmethod
+    def build_user_document(
+        user_data: User,
+        hashed_password: str,
+        role: str = "student",
+        created_at: Optional[datetime] = None
+    ) -> dict:
+        """
+        Build a users collection document.
+
+        Args:
+            user_data: Validated user data
+            hashed_password: bcrypt hash of the user's password
+            role: Account role (registration never trusts user_data.role)
+            created_at: Creation time (defaults to now)
+
+        Returns:
+            User document ready to insert
+        """
+        return {
+            "email": user_data.email,
+            "password": hashed_password,
+            "name": user_data.name,
+            "role": role,
+            "hostel": user_data.hostel,
+            "block": user_data.block,
+            "room": user_data.room,
+            "created_at": created_at or datetime.utcnow()
+        }
@@ -0,0 +1,310 @@
+"""
+Slow-query log.
+Issue list and admin analytics queries go through find(), aggregate() and
+count_documents() here. Those exceeding SLOW_QUERY_THRESHOLD_MS are
+recorded in the capped slow_queries collection with their filter shape
+(field names and operators, values redacted), duration and returned count.
+The first slow run of each shape (and then at most one per
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS per worker) also records an
+explain("executionStats") summary: the winning plan, documents and keys
+examined, and the docs-examined to docs-returned ratio. COLLSCANs, in-memory
+SORTs and unanchored $regex filters show up there.
+
+Recording happens in a background task, so the request that ran the slow
+query does not wait for the explain.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from pymongo.errors import CollectionInvalid
+from app.database import get_collection
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SLOW_QUERY_LOG_ENABLED = os.getenv("SLOW_QUERY_LOG_ENABLED", "true").lower() == "true"
+# Queries taking at least this long (including fetching every batch) are recorded
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+# Explain each slow shape at most this often per worker; explain re-runs the query
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = int(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "600"))
+# Size of the capped collection; the oldest entries are overwritten
+SLOW_QUERY_LOG_SIZE_MB = int(os.getenv("SLOW_QUERY_LOG_SIZE_MB", "16"))
+
+SLOW_QUERY_COLLECTION = "slow_queries"
+REDACTED = "?"
+
+# shape_id -> monotonic time of its last explain
+_last_explained: Dict[str, float] = {}
+# Keep references to recording tasks until they finish
+_pending = set()
+
+
+# Stages and operators whose arguments are aggregation expressions, where
+# "$name" strings are field paths rather than values
+EXPRESSION_OPERATORS = {
+    "$addFields", "$bucket", "$bucketAuto", "$expr", "$group", "$project",
+    "$replaceRoot", "$replaceWith", "$set", "$sortByCount", "$unwind"
+}
+
+
+def redact(value: Any, expression: bool = False) -> Any:
+    """
+    Shape of a filter or pipeline: keys and operators are kept, values
+    become "?". Field paths ("$category") are kept only inside aggregation
+    expressions ($group, $project, $expr, ...); in filters a "$..." string
+    is a value like any other. $and/$or/$nor branches and pipeline stages
+    keep their own shape.
+    """
+    if isinstance(value, dict):
+        return {
+            key: redact(item, expression or key in EXPRESSION_OPERATORS)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        if expression or (value and all(isinstance(item, dict) for item in value)):
+            return [redact(item, expression) for item in value]
+        return REDACTED
+    if expression and isinstance(value, str) and value.startswith("$"):
+        return value
+    return REDACTED
+
+
+def shape_of(collection: str, operation: str, spec: dict) -> tuple:
+    """(shape JSON, shape id) of a query; the id groups every run of the same shape."""
+    shape = json.dumps(redact(spec), sort_keys=True)
+    shape_id = hashlib.sha1(f"{collection}:{operation}:{shape}".encode()).hexdigest()[:16]
+    return shape, shape_id
+
+
+def _find_key(document: Any, key: str) -> Optional[dict]:
+    """First value under key anywhere in a nested explain document."""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        children = document.values()
+    elif isinstance(document, list):
+        children = document
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _plan_summary(node: dict) -> str:
+    """Winning plan as stages, e.g. "FETCH > IXSCAN(status_created_at)"."""
+    node = node.get("queryPlan", node)
+    stage = node.get("stage", "?")
+    if node.get("indexName"):
+        stage = f"{stage}({node['indexName']})"
+    if "inputStage" in node:
+        return f"{stage} > {_plan_summary(node['inputStage'])}"
+    if "inputStages" in node:
+        return f"{stage}[{', '.join(_plan_summary(child) for child in node['inputStages'])}]"
+    return stage
+
+
+def summarize_explain(explain: dict) -> dict:
+    """Plan and execution counters of an explain("executionStats") result (no values)."""
+    plan = _find_key(explain, "winningPlan") or {}
+    stats = _find_key(explain, "executionStats") or {}
+    summary = _plan_summary(plan) if plan else None
+    docs_examined = stats.get("totalDocsExamined", 0)
+    n_returned = stats.get("nReturned", 0)
+    return {
+        "plan": summary,
+        "collscan": bool(summary and "COLLSCAN" in summary),
+        "in_memory_sort": bool(summary and "SORT" in re.findall(r"[A-Z_]+", summary)),
+        "docs_examined": docs_examined,
+        "keys_examined": stats.get("totalKeysExamined", 0),
+        "n_returned": n_returned,
+        # Documents read per document the query stage returned; high means a poor index
+        "examined_ratio": round(docs_examined / max(n_returned, 1), 2),
+        "execution_ms": stats.get("executionTimeMillis")
+    }
+
+
+def _explain_command(collection, operation: str, spec: dict) -> dict:
+    if operation == "find":
+        command = {"find": collection.name, "filter": spec["filter"]}
+        for option in ("projection", "sort", "skip", "limit"):
+            if spec.get(option):
+                command[option] = spec[option]
+    elif operation == "count":
+        # count_documents runs this pipeline
+        command = {
+            "aggregate": collection.name,
+            "pipeline": [{"$match": spec["filter"]}, {"$group": {"_id": 1, "n": {"$sum": 1}}}],
+            "cursor": {}
+        }
+    else:
+        command = {"aggregate": collection.name, "pipeline": spec["pipeline"], "cursor": {}}
+    return {"explain": command, "verbosity": "executionStats"}
+
+
+async def _record(collection, operation: str, spec: dict, duration_ms: float, returned: int, source: str) -> None:
+    shape, shape_id = shape_of(collection.name, operation, spec)
+    entry = {
+        "shape_id": shape_id,
+        "source": source,
+        "collection": collection.name,
+        "operation": operation,
+        "shape": shape,
+        "duration_ms": round(duration_ms, 2),
+        "returned": returned,
+        "created_at": datetime.utcnow()
+    }
+    now = time.monotonic()
+    last = _last_explained.get(shape_id)
+    if last is None or now - last >= SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+        _last_explained[shape_id] = now
+        try:
+            explain = await collection.database.command(
+                _explain_command(collection, operation, spec),
+                read_preference=collection.read_preference
+            )
+            entry["explain"] = summarize_explain(explain)
+        except Exception as e:
+            # The slow run is still worth recording without its plan
+            entry["explain_error"] = str(e)
+    await get_collection(SLOW_QUERY_COLLECTION).insert_one(entry)
+    plan = entry.get("explain", {}).get("plan")
+    print(f"🐢 Slow query {source} ({collection.name}.{operation}, {duration_ms:.0f}ms, "
+          f"{returned} returned{', ' + plan if plan else ''}): {shape}")
+
+
+def _observe(collection, operation: str, spec: dict, started: float, returned: int, source: str) -> None:
+    duration_ms = (time.perf_counter() - started) * 1000
+    if not SLOW_QUERY_LOG_ENABLED or duration_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    async def record():
+        try:
+            await _record(collection, operation, spec, duration_ms, returned, source)
+        except Exception as e:
+            print(f"⚠️ Could not record slow query from {source}: {e}")
+
+    task = asyncio.create_task(record())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def find(
+    collection,
+    filter: dict,
+    projection: Optional[dict] = None,
+    sort: Optional[list] = None,
+    skip: int = 0,
+    limit: int = 0,
+    source: str = ""
+) -> List[dict]:
+    """
+    Run a find and return every matching document (at most limit).
+
+    Args:
+        collection: Motor collection
+        filter: Query filter
+        projection: Optional projection
+        sort: Optional list of (field, direction)
+        skip: Documents to skip
+        limit: Maximum documents (0 for no limit)
+        source: Caller, e.g. "IssueService.get_issues"
+
+    Returns:
+        List of documents
+    """
+    started = time.perf_counter()
+    cursor = collection.find(filter, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    if skip:
+        cursor = cursor.skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    documents = await cursor.to_list(length=limit or None)
+    spec = {"filter": filter}
+    for option, value in (("projection", projection), ("sort", dict(sort) if sort else None), ("skip", skip), ("limit", limit)):
+        if value:
+            spec[option] = value
+    _observe(collection, "find", spec, started, len(documents), source)
+    return documents
+
+
+async def aggregate(collection, pipeline: List[dict], length: Optional[int] = None, source: str = "") -> List[dict]:
+    """Run an aggregation and return up to length result documents."""
+    started = time.perf_counter()
+    documents = await collection.aggregate(pipeline).to_list(length=length)
+    _observe(collection, "aggregate", {"pipeline": pipeline}, started, len(documents), source)
+    return documents
+
+
+async def count_documents(collection, filter: dict, source: str = "") -> int:
+    """Count matching documents (recorded with the count as the returned value)."""
+    started = time.perf_counter()
+    count = await collection.count_documents(filter)
+    _observe(collection, "count", {"filter": filter}, started, count, source)
+    return count
+
+
+async def ensure_log_collection(db) -> None:
+    """Create the capped slow_queries collection if it does not exist yet."""
+    if not SLOW_QUERY_LOG_ENABLED or SLOW_QUERY_COLLECTION in await db.list_collection_names():
+        return
+    try:
+        await db.create_collection(SLOW_QUERY_COLLECTION, capped=True, size=SLOW_QUERY_LOG_SIZE_MB * 1024 * 1024)
+    except CollectionInvalid:
+        # Created by another worker meanwhile
+        pass
+
+
+async def worst_shapes(limit: int = 20, hours: int = 24) -> List[dict]:
+    """
+    Slow query shapes recorded in the last hours, ranked by total time spent.
+
+    Args:
+        limit: Maximum shapes
+        hours: Look-back window
+
+    Returns:
+        One entry per shape with run count, total/avg/max duration, worst
+        examined ratio and its most recent explain summary
+    """
+    since = datetime.utcnow() - timedelta(hours=hours)
+    pipeline = [
+        {"$match": {"created_at": {"$gte": since}}},
+        {"$sort": {"created_at": -1}},
+        {"$group": {
+            "_id": "$shape_id",
+            "source": {"$first": "$source"},
+            "collection": {"$first": "$collection"},
+            "operation": {"$first": "$operation"},
+            "shape": {"$first": "$shape"},
+            "count": {"$sum": 1},
+            "total_ms": {"$sum": "$duration_ms"},
+            "avg_ms": {"$avg": "$duration_ms"},
+            "max_ms": {"$max": "$duration_ms"},
+            "max_returned": {"$max": "$returned"},
+            "max_examined_ratio": {"$max": "$explain.examined_ratio"},
+            "last_seen": {"$first": "$created_at"},
+            # Newest first; runs without an explain push null
+            "explains": {"$push": {"$ifNull": ["$explain", None]}}
+        }},
+        {"$sort": {"total_ms": -1}},
+        {"$limit": limit}
+    ]
+    shapes = await get_collection(SLOW_QUERY_COLLECTION).aggregate(pipeline).to_list(length=limit)
+    result = []
+    for shape in shapes:
+        shape["shape_id"] = shape.pop("_id")
+        shape["total_ms"] = round(shape["total_ms"], 2)
+        shape["avg_ms"] = round(shape["avg_ms"], 2)
+        shape["explain"] = next((explain for explain in shape.pop("explains") if explain), None)
+        result.append(shape)
+    return result
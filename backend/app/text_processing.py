@@ -0,0 +1,88 @@
+"""
+Text normalization shared by issue search and duplicate detection.
+Pure standard library, so it can run on every request without loading the ML stack.
+"""
+import re
+from typing import Dict, List
+
+# Same token rule as scikit-learn's default word analyzer
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+# scikit-learn's ENGLISH_STOP_WORDS, copied so tokenizing does not import scikit-learn
+ENGLISH_STOP_WORDS = frozenset([
+    "a", "about", "above", "across", "after", "afterwards", "again", "against", "all",
+    "almost", "alone", "along", "already", "also", "although", "always", "am", "among",
+    "amongst", "amoungst", "amount", "an", "and", "another", "any", "anyhow", "anyone",
+    "anything", "anyway", "anywhere", "are", "around", "as", "at", "back", "be", "became",
+    "because", "become", "becomes", "becoming", "been", "before", "beforehand", "behind",
+    "being", "below", "beside", "besides", "between", "beyond", "bill", "both", "bottom",
+    "but", "by", "call", "can", "cannot", "cant", "co", "con", "could", "couldnt", "cry",
+    "de", "describe", "detail", "do", "done", "down", "due", "during", "each", "eg",
+    "eight", "either", "eleven", "else", "elsewhere", "empty", "enough", "etc", "even",
+    "ever", "every", "everyone", "everything", "everywhere", "except", "few", "fifteen",
+    "fifty", "fill", "find", "fire", "first", "five", "for", "former", "formerly", "forty",
+    "found", "four", "from", "front", "full", "further", "get", "give", "go", "had", "has",
+    "hasnt", "have", "he", "hence", "her", "here", "hereafter", "hereby", "herein",
+    "hereupon", "hers", "herself", "him", "himself", "his", "how", "however", "hundred",
+    "i", "ie", "if", "in", "inc", "indeed", "interest", "into", "is", "it", "its", "itself",
+    "keep", "last", "latter", "latterly", "least", "less", "ltd", "made", "many", "may",
+    "me", "meanwhile", "might", "mill", "mine", "more", "moreover", "most", "mostly",
+    "move", "much", "must", "my", "myself", "name", "namely", "neither", "never",
+    "nevertheless", "next", "nine", "no", "nobody", "none", "noone", "nor", "not",
+    "nothing", "now", "nowhere", "of", "off", "often", "on", "once", "one", "only", "onto",
+    "or", "other", "others", "otherwise", "our", "ours", "ourselves", "out", "over", "own",
+    "part", "per", "perhaps", "please", "put", "rather", "re", "same", "see", "seem",
+    "seemed", "seeming", "seems", "serious", "several", "she", "should", "show", "side",
+    "since", "sincere", "six", "sixty", "so", "some", "somehow", "someone", "something",
+    "sometime", "sometimes", "somewhere", "still", "such", "system", "take", "ten", "than",
+    "that", "the", "their", "them", "themselves", "then", "thence", "there", "thereafter",
+    "thereby", "therefore", "therein", "thereupon", "these", "they", "thick", "thin",
+    "third", "this", "those", "though", "three", "through", "throughout", "thru", "thus",
+    "to", "together", "too", "top", "toward", "towards", "twelve", "twenty", "two", "un",
+    "under", "until", "up", "upon", "us", "very", "via", "was", "we", "well", "were",
+    "what", "whatever", "when", "whence", "whenever", "where", "whereafter", "whereas",
+    "whereby", "wherein", "whereupon", "wherever", "whether", "which", "while", "whither",
+    "who", "whoever", "whole", "whom", "whose", "why", "will", "with", "within", "without",
+    "would", "yet", "you", "your", "yours", "yourself", "yourselves"
+])
+
+
+def preprocess_text(text: str) -> str:
+    """Clean and preprocess text for better similarity matching"""
+    # Convert to lowercase
+    text = text.lower()
+    # Remove special characters but keep spaces
+    text = re.sub(r'[^a-z0-9\s]', ' ', text)
+    # Remove extra whitespace
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized unigram tokens without stop words (stored as search_tokens)"""
+    return [
+        token for token in TOKEN_PATTERN.findall(preprocess_text(text))
+        if token not in ENGLISH_STOP_WORDS
+    ]
+
+
+def terms_from_tokens(tokens: List[str]) -> List[str]:
+    """Unigrams followed by bigrams, as TfidfVectorizer(ngram_range=(1, 2)) builds them"""
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+def analyze(text: str) -> List[str]:
+    """Terms used for TF-IDF similarity"""
+    return terms_from_tokens(tokenize(text))
+
+
+def search_fields(title: str, description: str) -> Dict:
+    """
+    Normalized text fields stored on issue documents at write time, so
+    search and similarity do not re-normalize them on every read.
+    """
+    text = f"{title} {description}"
+    return {
+        "search_text": preprocess_text(text),
+        "search_tokens": tokenize(text)
+    }
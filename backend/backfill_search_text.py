@@ -0,0 +1,54 @@
+"""
+Backfill normalized search fields (search_text, search_tokens) on existing issues
+Usage: python backfill_search_text.py [--all] [--batch-size 500]
+"""
+import argparse
+import asyncio
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+async def backfill(recompute_all: bool, batch_size: int):
+    mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/hostelfix")
+    client = AsyncIOMotorClient(mongodb_uri)
+    db = client.get_database()
+
+    from app.text_processing import search_fields
+
+    query = {} if recompute_all else {"search_text": {"$exists": False}}
+    total = await db.issues.count_documents(query)
+    print(f"🔎 Backfilling search fields on {total} issues...")
+
+    started = time.perf_counter()
+    updated = 0
+    batch = []
+    cursor = db.issues.find(query, {"title": 1, "description": 1}).batch_size(batch_size)
+    async for issue in cursor:
+        fields = search_fields(
+            issue.get("title") or "",
+            issue.get("description") or ""
+        )
+        batch.append(UpdateOne({"_id": issue["_id"]}, {"$set": fields}))
+        if len(batch) >= batch_size:
+            result = await db.issues.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+            batch = []
+            print(f"   {updated}/{total}")
+    if batch:
+        result = await db.issues.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Updated {updated} issues in {elapsed:.1f}s")
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill issue search fields")
+    parser.add_argument("--all", action="store_true", help="Recompute fields on every issue, not only missing ones")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents per bulk write")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.all, args.batch_size))
@@ -0,0 +1,261 @@
+"""
+Benchmark the duplicate detector on synthetic hostel-complaint corpora (no MongoDB needed)
+Usage: python benchmark_duplicate_detection.py [--sizes 100 1000 10000 100000] [--queries 200]
+                                               [--backend vocabulary|hashing]
+                                               [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+HOSTELS = ["Hostel A", "Hostel B", "Hostel C", "Hostel D"]
+BLOCKS = ["Block 1", "Block 2", "Block 3", "Block 4", "Block 5"]
+
+# category -> (subjects, problems, details)
+TEMPLATES = {
+    "electrical": (
+        ["fan", "tube light", "switch board", "power socket", "geyser", "bulb", "wiring", "ceiling fan"],
+        ["not working", "sparking", "making noise", "keeps flickering", "completely dead", "short circuit"],
+        ["since last night", "after the power cut", "in the study area", "near the window", "every evening"]
+    ),
+    "plumbing": (
+        ["tap", "flush", "shower", "wash basin", "water pipe", "drain", "water cooler", "tank"],
+        ["leaking", "blocked", "not working", "overflowing", "no water", "broken", "dripping continuously"],
+        ["in the common bathroom", "on the second floor", "water is wasted", "smells bad", "since morning"]
+    ),
+    "internet": (
+        ["wifi", "lan port", "router", "internet connection", "access point", "network"],
+        ["down", "very slow", "keeps disconnecting", "not connecting", "no signal", "dropping packets"],
+        ["cannot attend online classes", "since yesterday", "in the whole block", "at night", "after the update"]
+    ),
+    "cleanliness": (
+        ["corridor", "bathroom", "dustbin", "mess area", "staircase", "common room", "balcony"],
+        ["very dirty", "not cleaned", "overflowing", "smells bad", "has garbage piled up", "is full of insects"],
+        ["for three days", "needs daily cleaning", "near room 204", "after the weekend", "students are falling sick"]
+    ),
+    "furniture": (
+        ["bed", "chair", "study table", "cupboard", "door", "window", "mattress", "shelf"],
+        ["broken", "loose", "cannot be locked", "damaged", "creaking", "missing a handle", "has a broken leg"],
+        ["in my room", "needs replacement", "since check in", "hinge is broken", "unsafe to use"]
+    ),
+    "pest": (
+        ["cockroaches", "mosquitoes", "rats", "bed bugs", "ants", "lizards"],
+        ["everywhere", "in the room", "in the mess", "near the dustbin", "in the bathroom"],
+        ["need pest control", "cannot sleep", "spreading to other rooms", "for a week", "after the rain"]
+    ),
+}
+FILLERS = ["please fix", "kindly look into this", "urgent", "it is a big problem", "requested many times", "thanks"]
+
+
+def generate_corpus(size: int, seed: int) -> List[Dict]:
+    """Generate synthetic open issues spread across hostels, blocks and categories."""
+    rng = random.Random(seed)
+    categories = list(TEMPLATES)
+    issues = []
+    for i in range(size):
+        category = rng.choice(categories)
+        subjects, problems, details = TEMPLATES[category]
+        subject, problem = rng.choice(subjects), rng.choice(problems)
+        title = f"{subject} {problem}".capitalize()
+        description = " ".join([
+            f"The {subject} is {problem} {rng.choice(details)}.",
+            f"Also {rng.choice(subjects)} {rng.choice(problems)} {rng.choice(details)}." if rng.random() < 0.5 else "",
+            rng.choice(FILLERS)
+        ]).strip()
+        issues.append({
+            "_id": f"{i:024x}",
+            "title": title,
+            "description": description,
+            "status": "reported",
+            "category": category,
+            "hostel": rng.choice(HOSTELS),
+            "block": rng.choice(BLOCKS)
+        })
+    return issues
+
+
+def summarize(timings: List[float]) -> Dict:
+    """Latency percentiles (ms) and throughput (ops/s) for one stage."""
+    ordered = sorted(timings)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    total = sum(ordered)
+    return {
+        "runs": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "p50_ms": round(percentile(50), 4),
+        "p95_ms": round(percentile(95), 4),
+        "p99_ms": round(percentile(99), 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "throughput_per_s": round(len(ordered) / total, 2) if total else None
+    }
+
+
+def measure(func: Callable, args_list: List[tuple], memory_runs: int) -> Dict:
+    """
+    Time func over every argument tuple, then re-run a few calls under
+    tracemalloc for peak memory (kept separate so tracing does not skew latency).
+    """
+    timings = []
+    for args in args_list:
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    result = summarize(timings)
+
+    tracemalloc.start()
+    for args in args_list[:memory_runs]:
+        tracemalloc.reset_peak()
+        func(*args)
+    result["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 3)
+    tracemalloc.stop()
+    return result
+
+
+def benchmark_size(size: int, queries: int, seed: int, memory_runs: int, backend: str) -> Dict:
+    from app.ml_duplicate_detection import DuplicateDetector
+
+    corpus = generate_corpus(size, seed)
+    drafts = generate_corpus(queries, seed + 1)
+    detector = DuplicateDetector(similarity_threshold=0.7, backend=backend)
+    results = {}
+
+    # Index build (one run; memory measured on the same run)
+    tracemalloc.start()
+    started = time.perf_counter()
+    detector.build_index(corpus)
+    build_seconds = time.perf_counter() - started
+    build_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results["build_index"] = {
+        "runs": 1,
+        "seconds": round(build_seconds, 4),
+        "docs_per_s": round(size / build_seconds, 2),
+        "peak_memory_mb": round(build_peak / 1024 / 1024, 3)
+    }
+
+    texts = [f"{d['title']} {d['description']}" for d in drafts]
+    partitions = [(d["hostel"], d["block"], d["category"]) for d in drafts]
+    rng = random.Random(seed + 2)
+    pairs = [(texts[i], f"{c['title']} {c['description']}") for i, c in
+             enumerate(rng.choice(corpus) for _ in texts)]
+
+    results["detect_duplicates"] = measure(
+        lambda text: detector.detect_duplicates(text),
+        [(t,) for t in texts], memory_runs
+    )
+    results["detect_duplicates_partitioned"] = measure(
+        lambda text, partition: detector.detect_duplicates(text, partition=partition),
+        list(zip(texts, partitions)), memory_runs
+    )
+    results["extract_keywords"] = measure(
+        detector.extract_keywords, [(t,) for t in texts], memory_runs
+    )
+    results["find_matching_keywords"] = measure(
+        detector.find_matching_keywords, pairs, memory_runs
+    )
+    results["detect_duplicates_batch"] = measure(
+        lambda batch, parts: detector.detect_duplicates_batch(batch, partitions=parts),
+        [(texts, partitions)], 1
+    )
+    results["detect_duplicates_batch"]["items_per_s"] = round(
+        len(texts) * 1000 / results["detect_duplicates_batch"]["mean_ms"], 2
+    )
+    results["cluster_issues"] = measure(detector.cluster_issues, [()], 1)
+    return results
+
+
+def environment() -> Dict:
+    import numpy
+    import scipy
+    import sklearn
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": numpy.__version__,
+        "scipy": scipy.__version__,
+        "scikit_learn": sklearn.__version__
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """List stages whose p95 (or build time) regressed by more than tolerance."""
+    regressions = []
+    for size, stages in results["results"].items():
+        for stage, current in stages.items():
+            previous = baseline.get("results", {}).get(size, {}).get(stage)
+            if not previous:
+                continue
+            metric = "seconds" if "seconds" in current else "p95_ms"
+            if previous.get(metric) and current[metric] > previous[metric] * tolerance:
+                regressions.append(
+                    f"{size} docs / {stage}: {metric} {previous[metric]} -> {current[metric]}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark duplicate detection across corpus sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000], help="Corpus sizes")
+    parser.add_argument("--queries", type=int, default=200, help="Draft issues checked per corpus size")
+    parser.add_argument("--memory-runs", type=int, default=20, help="Calls per stage traced for peak memory")
+    parser.add_argument("--backend", choices=["vocabulary", "hashing"], default="vocabulary", help="Duplicate index backend")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic corpora")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Allowed slowdown vs baseline (1.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = {
+        "environment": environment(),
+        "config": {"sizes": args.sizes, "queries": args.queries, "seed": args.seed, "backend": args.backend},
+        "results": {}
+    }
+    for size in args.sizes:
+        print(f"⏱️  Benchmarking {size} documents...")
+        stages = benchmark_size(size, args.queries, args.seed, args.memory_runs, args.backend)
+        results["results"][str(size)] = stages
+        for stage, r in stages.items():
+            if "seconds" in r:
+                print(f"   {stage:<30} {r['seconds']:.3f}s  {r['docs_per_s']:.0f} docs/s  peak {r['peak_memory_mb']} MB")
+            else:
+                print(f"   {stage:<30} p50 {r['p50_ms']:.3f}ms  p95 {r['p95_ms']:.3f}ms  "
+                      f"p99 {r['p99_ms']:.3f}ms  peak {r['peak_memory_mb']} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("❌ Regressions against baseline:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
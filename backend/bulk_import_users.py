@@ -0,0 +1,170 @@
+"""
+Bulk import user accounts from a CSV or JSONL roster
+Usage: python bulk_import_users.py roster.csv [--default-password PASS] [--role student]
+                                   [--update-existing] [--workers 8] [--batch-size 500] [--dry-run]
+
+Roster fields: email, name, password (optional with --default-password),
+hostel, block, room, role (optional, defaults to --role).
+Passwords are hashed across a process pool and accounts are upserted by
+email in batched bulk writes.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+from app.auth import get_password_hash
+from app.models import User, UserRole
+from app.services.user_service import UserService
+
+load_dotenv()
+
+
+def read_roster(path: str) -> List[dict]:
+    """Rows of a .csv or .jsonl (one JSON object per line) roster."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def validate_rows(rows: List[dict], default_password: str, default_role: str) -> Tuple[Dict[str, User], List[str]]:
+    """
+    Validate roster rows into User models keyed by email (a repeated email
+    keeps its last row).
+
+    Returns:
+        Tuple of (users by email, error messages for rejected rows)
+    """
+    users: Dict[str, User] = {}
+    errors = []
+    for line, row in enumerate(rows, start=1):
+        row = {key.strip().lower(): (value.strip() if isinstance(value, str) else value)
+               for key, value in row.items() if key}
+        row = {key: value for key, value in row.items() if value not in ("", None)}
+        row.setdefault("password", default_password)
+        row.setdefault("role", default_role)
+        if not row["password"]:
+            errors.append(f"row {line}: no password and no --default-password")
+            continue
+        try:
+            user = User(**row)
+        except ValidationError as e:
+            fields = ", ".join(str(err["loc"][0]) for err in e.errors())
+            errors.append(f"row {line}: invalid {fields}")
+            continue
+        users[user.email] = user
+    return users, errors
+
+
+async def hash_passwords(users: List[User], workers: int) -> List[str]:
+    """bcrypt every password across a process pool."""
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return await asyncio.gather(*[
+            loop.run_in_executor(pool, get_password_hash, user.password) for user in users
+        ])
+
+
+def build_operations(users: List[User], hashes: List[str], update_existing: bool) -> List[UpdateOne]:
+    """
+    Upserts by email. New accounts get the full document; existing ones are
+    left alone, or with update_existing have their profile, role and
+    password replaced and their sessions revoked.
+    """
+    now = datetime.utcnow()
+    operations = []
+    for user, hashed_password in zip(users, hashes):
+        doc = UserService.build_user_document(user, hashed_password, role=user.role.value, created_at=now)
+        if update_existing:
+            created_at = doc.pop("created_at")
+            update = {
+                "$set": doc,
+                "$setOnInsert": {"created_at": created_at},
+                # Tokens issued with the old password or role stop working
+                "$inc": {"token_version": 1}
+            }
+        else:
+            update = {"$setOnInsert": doc}
+        operations.append(UpdateOne({"email": user.email}, update, upsert=True))
+    return operations
+
+
+async def import_users(args) -> None:
+    started = time.perf_counter()
+    rows = read_roster(args.roster)
+    users, errors = validate_rows(rows, args.default_password, args.role)
+    for error in errors:
+        print(f"❌ {error}")
+    print(f"📋 {len(rows)} rows read, {len(users)} valid accounts, {len(errors)} rejected")
+    if not users:
+        return
+
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017/hostelfix"))
+    db = client.get_database()
+    try:
+        accounts = list(users.values())
+        if not args.update_existing:
+            # Existing accounts are left untouched, so skip hashing their passwords
+            emails = [user.email for user in accounts]
+            existing = set()
+            for i in range(0, len(emails), args.batch_size):
+                cursor = db.users.find({"email": {"$in": emails[i:i + args.batch_size]}}, {"email": 1, "_id": 0})
+                existing.update([doc["email"] async for doc in cursor])
+            accounts = [user for user in accounts if user.email not in existing]
+            print(f"⏭️  {len(existing)} accounts already exist and are skipped")
+            if not accounts:
+                return
+
+        hash_started = time.perf_counter()
+        hashes = await hash_passwords(accounts, args.workers)
+        hash_seconds = time.perf_counter() - hash_started
+        print(f"🔐 Hashed {len(hashes)} passwords in {hash_seconds:.1f}s "
+              f"({len(hashes) / hash_seconds:.0f}/s with {args.workers} workers)")
+
+        operations = build_operations(accounts, hashes, args.update_existing)
+        if args.dry_run:
+            print(f"✅ Dry run: {len(operations)} accounts would be written")
+            return
+
+        write_started = time.perf_counter()
+        inserted = updated = 0
+        for i in range(0, len(operations), args.batch_size):
+            result = await db.users.bulk_write(operations[i:i + args.batch_size], ordered=False)
+            inserted += result.upserted_count
+            updated += result.modified_count
+        write_seconds = time.perf_counter() - write_started
+    finally:
+        client.close()
+
+    total_seconds = time.perf_counter() - started
+    print(f"💾 Wrote {len(operations)} accounts in {write_seconds:.1f}s: {inserted} created, {updated} updated")
+    print(f"✅ Imported {len(operations)} accounts in {total_seconds:.1f}s ({len(operations) / total_seconds:.0f} accounts/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import user accounts from a CSV or JSONL roster")
+    parser.add_argument("roster", help="Roster file (.csv or .jsonl)")
+    parser.add_argument("--default-password", default="", help="Password for rows without one")
+    parser.add_argument("--role", choices=[role.value for role in UserRole], default="student",
+                        help="Role for rows without one")
+    parser.add_argument("--update-existing", action="store_true",
+                        help="Overwrite profile, role and password of existing accounts (signs them out)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Password hashing processes")
+    parser.add_argument("--batch-size", type=int, default=500, help="Accounts per bulk write")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and hash without writing")
+    args = parser.parse_args()
+    asyncio.run(import_users(args))
+
+
+if __name__ == "__main__":
+    main()
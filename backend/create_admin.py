@@ -38,9 +38,11 @@ async def create_admin():
         if response == 'y':
             await db.users.update_one(
                 {"email": email},
-                {"$set": {"role": "admin"}}
+                # Bumping the token version revokes tokens carrying the old role
+                {"$set": {"role": "admin"}, "$inc": {"token_version": 1}}
             )
             print(f"✅ User {email} has been promoted to admin!")
+            print("   Existing sessions are signed out; log in again at /login/admin")
         client.close()
         return
     
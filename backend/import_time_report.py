@@ -0,0 +1,97 @@
+"""
+Report API cold-start import time and what the lazily loaded ML stack would add
+Usage: python import_time_report.py [--runs 3] [--top 15] [--json]
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Imported on first use / by the background warm-up, never at startup
+DEFERRED_MODULES = ["sklearn", "scipy", "numpy", "pandas", "app.ml_duplicate_detection"]
+
+STARTUP = "import main"
+# What startup cost when main imported the ML stack eagerly
+EAGER = "import main, app.ml_duplicate_detection"
+
+
+def import_times(statement: str) -> List[Tuple[str, int, int]]:
+    """Run statement in a fresh interpreter with -X importtime; (module, self_us, cumulative_us) per import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level after the separator space
+        rows.append((name.rstrip()[1:], int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(statement: str, runs: int) -> Dict:
+    """Fastest of several runs (the least disturbed by other processes)."""
+    best = None
+    for _ in range(runs):
+        rows = import_times(statement)
+        # Top-level imports are the ones without indentation
+        total = sum(cumulative for name, _, cumulative in rows if not name.startswith(" "))
+        if best is None or total < best[0]:
+            best = (total, rows)
+    total, rows = best
+    loaded = {name.strip() for name, _, _ in rows}
+    return {
+        "total_ms": round(total / 1000, 1),
+        "modules": len(rows),
+        "deferred_modules_loaded": [m for m in DEFERRED_MODULES if m in loaded],
+        "rows": rows
+    }
+
+
+def heaviest(rows: List[Tuple[str, int, int]], top: int) -> List[Dict]:
+    """Top-level packages (first dotted component) by summed self time."""
+    totals: Dict[str, int] = {}
+    for name, self_us, _ in rows:
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    ranked = sorted(totals.items(), key=lambda x: x[1], reverse=True)[:top]
+    return [{"package": package, "ms": round(us / 1000, 1)} for package, us in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report API import time at startup")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per measurement (fastest is reported)")
+    parser.add_argument("--top", type=int, default=15, help="Heaviest packages to list")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    startup = measure(STARTUP, args.runs)
+    eager = measure(EAGER, args.runs)
+    report = {
+        "startup_ms": startup["total_ms"],
+        "startup_modules": startup["modules"],
+        "eager_ml_startup_ms": eager["total_ms"],
+        "saved_ms": round(eager["total_ms"] - startup["total_ms"], 1),
+        "deferred_modules_loaded_at_startup": startup["deferred_modules_loaded"],
+        "heaviest_at_startup": heaviest(startup["rows"], args.top)
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"⏱️  import main:                    {report['startup_ms']:.1f} ms ({report['startup_modules']} modules)")
+    print(f"⏱️  import main + ML stack (eager): {report['eager_ml_startup_ms']:.1f} ms")
+    print(f"✅ Deferred to first use / warm-up: {report['saved_ms']:.1f} ms")
+    if report["deferred_modules_loaded_at_startup"]:
+        print(f"❌ Loaded at startup but should be lazy: {', '.join(report['deferred_modules_loaded_at_startup'])}")
+    print("\nHeaviest packages at startup (self time):")
+    for row in report["heaviest_at_startup"]:
+        print(f"   {row['package']:<24} {row['ms']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
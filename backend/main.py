@@ -1,20 +1,51 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+import asyncio
 import os
 
-from app.database import connect_to_mongo, close_mongo_connection
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.indexes import ensure_indexes
+from app.slow_query_log import ensure_log_collection
+from app.metrics import PrometheusMiddleware, metrics_response, require_metrics_token
+from app.executors import ml_executor, password_executor
 from app.routers import auth, issues, admin, lost_found, announcements
+from app.services.duplicate_service import DuplicateService
+from app.services.cluster_service import ClusterService
+from app.services.token_service import TokenService
 
 load_dotenv()
 
+# Create missing indexes from the registry in app/indexes.py at startup
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    # Capped collection; must exist before anything writes to it
+    await ensure_log_collection(get_database())
+    if MONGO_ENSURE_INDEXES:
+        created = await ensure_indexes(get_database())
+        for collection, names in created.items():
+            if names:
+                print(f"✅ Created indexes on {collection}: {', '.join(names)}")
+    # Revoked token versions are checked in memory on every request
+    await TokenService.refresh()
+    token_task = asyncio.create_task(TokenService.refresh_periodically())
+    # ML stack and duplicate index load in the background; the API serves meanwhile
+    warm_up_task = DuplicateService.start_warm_up()
+    refresh_task = asyncio.create_task(DuplicateService.refresh_periodically())
+    cluster_task = asyncio.create_task(ClusterService.cluster_periodically())
     yield
     # Shutdown
+    warm_up_task.cancel()
+    refresh_task.cancel()
+    cluster_task.cancel()
+    token_task.cancel()
+    ml_executor.shutdown()
+    password_executor.shutdown()
     await close_mongo_connection()
 
 app = FastAPI(
@@ -33,6 +64,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-route HTTP latency and MongoDB command metrics, served at /metrics
+app.add_middleware(PrometheusMiddleware)
 
 # Include routers with API versioning
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
@@ -55,3 +88,8 @@ async def root():
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return metrics_response()
@@ -0,0 +1,108 @@
+"""
+Report or create the MongoDB indexes declared in app/indexes.py
+Usage: python manage_indexes.py [report|ensure] [--json]
+
+report (default) lists registered indexes that are missing, indexes that
+exist but are not registered, and indexes with no recorded use ($indexStats
+counts accesses since the index was built or the server last restarted).
+"""
+import argparse
+import asyncio
+import json
+import os
+from typing import Dict, List
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+from app.indexes import INDEXES, ensure_indexes, index_key
+
+load_dotenv()
+
+
+async def index_usage(db, collection: str) -> Dict[str, dict]:
+    """Index name -> {"ops", "since"} from $indexStats."""
+    stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(length=None)
+    return {
+        stat["name"]: {"ops": stat["accesses"]["ops"], "since": stat["accesses"]["since"].isoformat()}
+        for stat in stats
+    }
+
+
+async def build_report(db) -> Dict[str, dict]:
+    collections = sorted(set(INDEXES) | set(await db.list_collection_names()))
+    report = {}
+    for collection in collections:
+        if collection.startswith("system."):
+            continue
+        registered = {index.document["name"]: index.document for index in INDEXES.get(collection, [])}
+        existing = await db[collection].index_information()
+        existing_keys = {index_key(info["key"]): name for name, info in existing.items()}
+        usage = await index_usage(db, collection) if existing else {}
+
+        missing = []
+        for name, document in registered.items():
+            if name in existing:
+                continue
+            same_keys = existing_keys.get(index_key(document["key"]))
+            missing.append({"name": name, "exists_as": same_keys} if same_keys else {"name": name})
+        unregistered = [name for name in existing if name != "_id_" and name not in registered]
+        unused = [
+            {"name": name, "since": usage[name]["since"]}
+            for name in existing
+            if name != "_id_" and name in usage and usage[name]["ops"] == 0
+        ]
+        report[collection] = {
+            "indexes": {name: usage.get(name, {}).get("ops") for name in existing},
+            "missing": missing,
+            "unregistered": unregistered,
+            "unused": unused
+        }
+    return report
+
+
+def print_report(report: Dict[str, dict]) -> None:
+    problems = 0
+    for collection, entry in report.items():
+        print(f"📦 {collection}")
+        for name, ops in entry["indexes"].items():
+            print(f"   {name:<32} {ops if ops is not None else '-':>10} ops")
+        for index in entry["missing"]:
+            note = f" (same keys exist as {index['exists_as']})" if index.get("exists_as") else ""
+            print(f"   ❌ missing: {index['name']}{note}")
+        for name in entry["unregistered"]:
+            print(f"   ⚠️  not in registry: {name}")
+        for index in entry["unused"]:
+            print(f"   ⚠️  unused since {index['since']}: {index['name']}")
+        problems += len(entry["missing"]) + len(entry["unregistered"]) + len(entry["unused"])
+    if problems:
+        print(f"\n{problems} index issue(s); run 'python manage_indexes.py ensure' to create missing indexes")
+    else:
+        print("\n✅ All registered indexes exist and are in use")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Report or create MongoDB indexes from the registry")
+    parser.add_argument("command", nargs="?", choices=["report", "ensure"], default="report")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017/hostelfix"))
+    db = client.get_database()
+    try:
+        if args.command == "ensure":
+            created = await ensure_indexes(db)
+            names: List[str] = [f"{collection}.{name}" for collection, names in created.items() for name in names]
+            print(f"✅ Created {len(names)} index(es){': ' + ', '.join(names) if names else ''}")
+            return
+
+        report = await build_report(db)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_report(report)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -171,7 +171,9 @@ async def seed_database():
         }
     ]
     
+    from app.text_processing import search_fields
     for issue in issues:
+        issue.update(search_fields(issue["title"], issue["description"]))
         await db.issues.insert_one(issue)
     print(f"✅ Created {len(issues)} sample issues")
     
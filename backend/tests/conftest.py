@@ -0,0 +1,11 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app import database
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """In-memory stand-in for the MongoDB database behind get_database()."""
+    db = AsyncMongoMockClient()["hostelfix_test"]
+    monkeypatch.setattr(database, "database", db)
+    return db
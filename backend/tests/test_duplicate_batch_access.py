@@ -0,0 +1,55 @@
+"""Batch duplicate checks search the caller's own hostel/block unless the caller is an admin."""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.models import BatchDuplicateCheckRequest
+from app.routers.issues import check_duplicate_issues_batch
+from app.services.duplicate_service import DuplicateService
+
+DRAFT = {"title": "Leaking tap", "description": "Bathroom tap leaking", "category": "plumbing", "priority": "medium"}
+LOCATIONS = {"s@x.com": ("Hostel A", "Block 1"), "a@x.com": (None, None)}
+
+
+@pytest.fixture
+def searched(monkeypatch):
+    partitions = []
+
+    async def reporter_location(user_email):
+        return LOCATIONS[user_email]
+
+    async def check_duplicates_batch(issues, hostel=None, block=None):
+        partitions.append((hostel, block))
+        return {"results": [], "groups": []}
+
+    monkeypatch.setattr(DuplicateService, "reporter_location", reporter_location)
+    monkeypatch.setattr(DuplicateService, "check_duplicates_batch", check_duplicates_batch)
+    return partitions
+
+
+def check(payload, **location):
+    batch = BatchDuplicateCheckRequest(issues=[DRAFT], **location)
+    return asyncio.run(check_duplicate_issues_batch(batch, payload=payload))
+
+
+STUDENT = {"sub": "s@x.com", "role": "student"}
+ADMIN = {"sub": "a@x.com", "role": "admin"}
+
+
+@pytest.mark.parametrize("location", [{}, {"hostel": "Hostel A"}, {"hostel": "Hostel A", "block": "Block 1"}])
+def test_student_searches_own_location(searched, location):
+    check(STUDENT, **location)
+    assert searched == [("Hostel A", "Block 1")]
+
+
+@pytest.mark.parametrize("location", [{"hostel": "Hostel B"}, {"block": "Block 2"}, {"hostel": "Hostel A", "block": "Block 2"}])
+def test_student_cannot_search_other_locations(searched, location):
+    with pytest.raises(HTTPException) as error:
+        check(STUDENT, **location)
+    assert error.value.status_code == 403
+    assert searched == []
+
+
+def test_admin_chooses_location(searched):
+    check(ADMIN, hostel="Hostel B", block="Block 2")
+    check(ADMIN)
+    assert searched == [("Hostel B", "Block 2"), (None, None)]
@@ -0,0 +1,250 @@
+"""
+The incremental duplicate index must score like the original detector:
+TfidfVectorizer fitted on the open issues plus the draft, then cosine similarity.
+"""
+import threading
+import numpy as np
+import pytest
+from scipy.sparse.csgraph import connected_components
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from app import text_processing
+from app.ml_duplicate_detection import DuplicateDetector, DuplicateIndex, MinHashLSH
+from benchmark_duplicate_detection import generate_corpus
+
+DRAFTS = [
+    "Fan not working since last night, please fix",
+    "wifi very slow in the whole block, cannot attend online classes",
+    "Tap leaking in the common bathroom zzqx unknownword",
+    "",
+]
+
+
+def issue_text(issue):
+    return f"{issue['title']} {issue['description']}"
+
+
+def refit_scores(texts, draft, max_features=5000):
+    """Cosine similarity of draft with texts, fitted as the original detector did."""
+    vectorizer = TfidfVectorizer(max_features=max_features, stop_words="english", ngram_range=(1, 2), min_df=1)
+    matrix = vectorizer.fit_transform(
+        [text_processing.preprocess_text(text) for text in texts] + [text_processing.preprocess_text(draft)]
+    )
+    return cosine_similarity(matrix[-1], matrix[:-1])[0]
+
+
+@pytest.fixture
+def corpus():
+    return generate_corpus(400, seed=7)
+
+
+def build(corpus, **options):
+    index = DuplicateIndex(text_processing.analyze, **{"ann_min_docs": 10 ** 9, **options})
+    for i, issue in enumerate(corpus):
+        index.add(str(i), issue_text(issue))
+    return index
+
+
+def assert_matches_refit(index, corpus, draft, max_features=5000):
+    keys, scores = index.query(draft)
+    expected = refit_scores([issue_text(corpus[int(key)]) for key in keys], draft, max_features)
+    np.testing.assert_allclose(scores, expected, atol=1e-9)
+
+
+@pytest.mark.parametrize("draft", DRAFTS)
+def test_scores_match_full_refit(corpus, draft):
+    assert_matches_refit(build(corpus), corpus, draft)
+
+
+def untied_cap(texts, at_least):
+    """
+    Smallest max_features >= at_least that does not cut between terms with
+    equal totals; scikit-learn breaks such ties in unspecified order.
+    """
+    counts = CountVectorizer(stop_words="english", ngram_range=(1, 2)).fit_transform(
+        [text_processing.preprocess_text(text) for text in texts]
+    )
+    totals = np.sort(np.asarray(counts.sum(axis=0)).ravel())[::-1]
+    return next(k for k in range(at_least, len(totals)) if totals[k - 1] > totals[k])
+
+
+@pytest.mark.parametrize("draft", DRAFTS[:2])
+def test_max_features_matches_full_refit(corpus, draft):
+    cap = untied_cap([issue_text(issue) for issue in corpus] + [draft], 60)
+    assert_matches_refit(build(corpus, max_features=cap), corpus, draft, max_features=cap)
+
+
+def test_updates_and_removals_match_full_refit(corpus):
+    index = build(corpus)
+    for i in range(0, len(corpus), 3):
+        index.remove(str(i))
+    for i in range(0, len(corpus), 9):
+        # Re-added under the same key with another issue's text
+        corpus[i] = corpus[(i + 1) % len(corpus)]
+        index.add(str(i), issue_text(corpus[i]))
+
+    keys, _ = index.query(DRAFTS[0])
+    assert sorted(keys, key=int) == [str(i) for i in range(len(corpus)) if i % 3 or i % 9 == 0]
+    for draft in DRAFTS:
+        assert_matches_refit(index, corpus, draft)
+
+
+def test_partition_search_uses_whole_index_idf(corpus):
+    index = DuplicateIndex(text_processing.analyze, ann_min_docs=10 ** 9)
+    for i, issue in enumerate(corpus):
+        index.add(str(i), issue_text(issue), partition=(issue["category"],))
+
+    _, keys, scores = index.search(DRAFTS[0], partition=("electrical",))
+    assert keys and all(corpus[int(key)]["category"] == "electrical" for key in keys)
+    refit = refit_scores([issue_text(issue) for issue in corpus], DRAFTS[0])
+    np.testing.assert_allclose(scores, refit[[int(key) for key in keys]], atol=1e-9)
+
+
+def test_batch_scores_match_refit_on_corpus_plus_batch(corpus):
+    index = build(corpus)
+    drafts = DRAFTS[:3]
+    queries, _, n_features, keys, scores = index.search_many(drafts)
+
+    vectorizer = TfidfVectorizer(max_features=5000, stop_words="english", ngram_range=(1, 2), min_df=1)
+    matrix = vectorizer.fit_transform(
+        [text_processing.preprocess_text(issue_text(corpus[int(key)])) for key in keys]
+        + [text_processing.preprocess_text(draft) for draft in drafts]
+    )
+    expected = cosine_similarity(matrix[-3:], matrix[:-3])
+    np.testing.assert_allclose(scores.toarray(), expected, atol=1e-9)
+    np.testing.assert_allclose((queries @ queries.T).toarray(), cosine_similarity(matrix[-3:]), atol=1e-9)
+
+
+def test_detector_reports_same_duplicates_as_refit(corpus):
+    detector = DuplicateDetector(similarity_threshold=0.7)
+    detector.build_index(corpus)
+    texts = [issue_text(issue) for issue in corpus]
+    for draft in [texts[5], texts[17] + " urgent", DRAFTS[0]]:
+        expected = refit_scores(texts, draft)
+        result = detector.detect_duplicates(draft)
+        above = np.sort(expected[expected >= 0.7])[::-1]
+        assert result["is_duplicate"] == bool(len(above))
+        assert [issue["similarity_score"] for issue in result["similar_issues"]] == [
+            round(float(score), 3) for score in above[:5]
+        ]
+        for issue in result["similar_issues"]:
+            assert issue["similarity_score"] == round(float(expected[int(issue["id"], 16)]), 3)
+
+
+def test_snapshot_round_trip(tmp_path, corpus):
+    detector = DuplicateDetector()
+    detector.build_index(corpus)
+    detector.index_issue({**corpus[0], "title": "Geyser sparking", "description": "Geyser sparking in room 12"})
+    detector.save_snapshot(str(tmp_path))
+
+    loaded = DuplicateDetector()
+    assert loaded.load_snapshot(str(tmp_path)) is not None
+    for draft in DRAFTS:
+        keys, scores = detector.index.query(draft)
+        loaded_keys, loaded_scores = loaded.index.query(draft)
+        assert loaded_keys == keys
+        np.testing.assert_allclose(loaded_scores, scores)
+
+
+def refit_clusters(corpus, threshold, max_features):
+    """Groups of two or more issues linked by refit cosine >= threshold within each partition."""
+    vectorizer = TfidfVectorizer(max_features=max_features, stop_words="english", ngram_range=(1, 2), min_df=1)
+    matrix = vectorizer.fit_transform([text_processing.preprocess_text(issue_text(issue)) for issue in corpus])
+    partitions = {}
+    for i, issue in enumerate(corpus):
+        partitions.setdefault((issue["hostel"], issue["block"], issue["category"]), []).append(i)
+    groups = set()
+    for rows in partitions.values():
+        # Tolerance for scores a rounding error away from the threshold
+        linked = cosine_similarity(matrix[rows]) >= threshold - 1e-9
+        _, labels = connected_components(linked, directed=False)
+        for label in set(labels):
+            members = [str(rows[i]) for i in np.flatnonzero(labels == label)]
+            if len(members) > 1:
+                groups.add(frozenset(members))
+    return groups
+
+
+def test_clusters_with_more_terms_than_max_features(corpus):
+    cap = untied_cap([issue_text(issue) for issue in corpus], 60)
+    index = DuplicateIndex(text_processing.analyze, ann_min_docs=10 ** 9, max_features=cap)
+    for i, issue in enumerate(corpus):
+        index.add(str(i), issue_text(issue), partition=(issue["hostel"], issue["block"], issue["category"]))
+    assert index.n_features > cap
+
+    groups = index.clusters(0.7)
+    assert groups
+    assert {frozenset(group["keys"]) for group in groups} == refit_clusters(corpus, 0.7, cap)
+
+
+def test_hashing_backend_clusters(corpus):
+    hashing = DuplicateDetector(backend="hashing")
+    hashing.build_index(corpus)
+    vocabulary = DuplicateDetector()
+    vocabulary.build_index(corpus)
+
+    clusters = hashing.cluster_issues()
+    assert clusters
+    assert [cluster["issue_ids"] for cluster in clusters] == [
+        cluster["issue_ids"] for cluster in vocabulary.cluster_issues()
+    ]
+
+
+def test_empty_index():
+    detector = DuplicateDetector()
+    detector.build_index([])
+    assert detector.cluster_issues() == []
+    assert detector.detect_duplicates("Fan not working")["is_duplicate"] is False
+    keys, scores = detector.index.query("Fan not working")
+    assert keys == [] and len(scores) == 0
+
+
+def test_lsh_signatures_match_per_document_minhash():
+    lsh = MinHashLSH(bands=8, rows=2)
+    sets = [np.array([5, 17, 99], dtype=np.uint64), np.array([], dtype=np.uint64), np.arange(20000, dtype=np.uint64)]
+    indptr = np.cumsum([0] + [len(hashes) for hashes in sets])
+    signatures = lsh.signatures(np.concatenate(sets), indptr)
+    for hashes, signature in zip(sets, signatures):
+        expected = ((np.outer(hashes, lsh._a) + lsh._b) % lsh._PRIME).min(axis=0) if len(hashes) else 0
+        np.testing.assert_array_equal(signature, expected)
+
+
+def test_lsh_is_built_lazily_and_kept_up_to_date(corpus):
+    index = build(corpus, ann_min_docs=len(corpus) + 1)
+    index.query(DRAFTS[0])
+    assert not index._lsh_ready
+
+    fresh = build(corpus, ann_min_docs=len(corpus) + 1)
+    # Crossing ann_min_docs builds the tables from the counts on the first search
+    index.add("extra", DRAFTS[0])
+    fresh.add("extra", DRAFTS[0])
+    fresh.prepare()
+    keys, _ = index.query(DRAFTS[0])
+    assert index._lsh_ready and "extra" in keys
+
+    # Later changes update the built tables as if they had been there from the start
+    index.remove("0")
+    fresh.remove("0")
+    index.add("1", DRAFTS[1])
+    fresh.add("1", DRAFTS[1])
+    for draft in DRAFTS:
+        terms = text_processing.analyze(draft)
+        assert index.lsh.candidates(index._term_hashes(terms)) == fresh.lsh.candidates(fresh._term_hashes(terms))
+
+
+def test_snapshot_files_are_written_outside_the_lock(tmp_path, corpus, monkeypatch):
+    index = build(corpus)
+    save_array = np.save
+
+    def save_while_updating(file, array):
+        # A concurrent update must not have to wait for the files
+        updater = threading.Thread(target=index.add, args=("new", DRAFTS[0]))
+        updater.start()
+        updater.join(timeout=5)
+        assert not updater.is_alive()
+        save_array(file, array)
+
+    monkeypatch.setattr(np, "save", save_while_updating)
+    manifest = index.save(str(tmp_path / "snapshot"))
+    assert manifest["documents"] == len(corpus) and "new" in index
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["snapshot"]
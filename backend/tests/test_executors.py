@@ -0,0 +1,56 @@
+"""A bounded executor never runs more than max_concurrency jobs, even when callers give up."""
+import asyncio
+import threading
+import pytest
+from app.executors import BoundedExecutor
+
+
+def test_cancelled_caller_keeps_its_slot_until_the_job_ends():
+    executor = BoundedExecutor("test", max_workers=2, max_concurrency=1)
+    release = threading.Event()
+    started = []
+
+    def job(name):
+        started.append(name)
+        release.wait(5)
+        return name
+
+    async def scenario():
+        first = asyncio.create_task(executor.run(job, "first"))
+        while not started:
+            await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        # The first job still occupies the only slot
+        second = asyncio.create_task(executor.run(job, "second"))
+        await asyncio.sleep(0.1)
+        assert started == ["first"]
+        assert executor.running == 1 and executor.queued == 1
+
+        release.set()
+        assert await second == "second"
+        return executor.stats()
+
+    stats = asyncio.run(scenario())
+    executor.shutdown()
+    assert stats["running"] == 0 and stats["queue_depth"] == 0
+    assert stats["completed"] == 2 and stats["failed"] == 0
+
+
+def test_failures_are_counted_and_free_the_slot():
+    executor = BoundedExecutor("test", max_workers=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await executor.run(fail)
+        return await executor.run(sum, [1, 2])
+
+    assert asyncio.run(scenario()) == 3
+    executor.shutdown()
+    assert executor.stats()["failed"] == 1 and executor.stats()["completed"] == 1
+    assert executor.running == 0
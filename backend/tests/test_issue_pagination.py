@@ -0,0 +1,82 @@
+"""Cursor pages walk the issue list in LIST_SORT order without gaps or repeats."""
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from app.services.issue_service import IssueService, _decode_cursor, _encode_cursor
+
+
+def test_cursor_round_trip():
+    issue = {"created_at": datetime(2024, 5, 1, 12, 30, 15, 123000), "_id": ObjectId()}
+    assert _decode_cursor(_encode_cursor(issue)) == {
+        "created_at": {"$lte": issue["created_at"]},
+        "$nor": [{"created_at": issue["created_at"], "_id": {"$gte": issue["_id"]}}]
+    }
+    # URL-safe and unpadded
+    assert all(c.isalnum() or c in "-_" for c in _encode_cursor(issue))
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "eyJjIjoxfQ", "eyJjIjoiYSIsImkiOiJ4In0"])
+def test_malformed_cursor(cursor):
+    with pytest.raises(ValueError):
+        _decode_cursor(cursor)
+
+
+def seed(db, count):
+    # Several issues share each created_at, so pages end inside runs of ties
+    start = datetime(2024, 1, 1)
+    issues = [
+        {"_id": ObjectId(), "title": f"Issue {i}", "is_public": True, "created_by": "s@x.com",
+         "status": "reported", "created_at": start + timedelta(seconds=i // 4)}
+        for i in range(count)
+    ]
+    asyncio.run(db.issues.insert_many(issues))
+    return [str(issue["_id"]) for issue in sorted(issues, key=lambda i: (i["created_at"], i["_id"]), reverse=True)]
+
+
+def list_issues(**options):
+    return asyncio.run(IssueService.get_issues("s@x.com", "student", **options))
+
+
+def walk(first_page):
+    ids = [issue["id"] for issue in first_page["issues"]]
+    cursor = first_page["pagination"]["next_cursor"]
+    # A cursor that repeats issues could loop forever
+    for _ in range(100):
+        if not cursor:
+            return ids
+        page = list_issues(limit=first_page["pagination"]["limit"], cursor=cursor)
+        ids += [issue["id"] for issue in page["issues"]]
+        cursor = page["pagination"]["next_cursor"]
+    pytest.fail("cursor pages did not end")
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 7, 50])
+def test_cursor_pages_cover_every_issue_once(db, limit):
+    expected = seed(db, 42)
+    assert walk(list_issues(limit=limit)) == expected
+
+
+def test_numbered_page_hands_over_to_cursor(db):
+    expected = seed(db, 30)
+    page = list_issues(page=2, limit=7)
+    assert [issue["id"] for issue in page["issues"]] == expected[7:14]
+    assert walk(page) == expected[7:]
+
+
+def test_new_issues_do_not_shift_cursor_pages(db):
+    expected = seed(db, 20)
+    first = list_issues(limit=6)
+    asyncio.run(db.issues.insert_one({
+        "title": "Newest", "is_public": True, "created_by": "s@x.com", "created_at": datetime(2030, 1, 1)
+    }))
+    assert walk(first) == expected
+
+
+def test_last_page_has_no_cursor(db):
+    seed(db, 8)
+    page = list_issues(limit=8)
+    assert page["pagination"]["next_cursor"] is None
+    page = list_issues(limit=4, cursor=list_issues(limit=4)["pagination"]["next_cursor"])
+    assert len(page["issues"]) == 4
+    assert page["pagination"] == {"limit": 4, "has_next": False, "next_cursor": None}
@@ -0,0 +1,30 @@
+"""/metrics is served only to scrapers presenting METRICS_TOKEN."""
+import pytest
+from fastapi.testclient import TestClient
+from app import metrics
+from main import app
+
+client = TestClient(app)
+
+
+def test_disabled_without_token(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "")
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 404
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", "Basic s3cret", "s3cret", "Bearer s3cret2"])
+def test_rejects_missing_or_wrong_token(monkeypatch, authorization):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    headers = {"Authorization": authorization} if authorization else {}
+    response = client.get("/metrics", headers=headers)
+    assert response.status_code == 401
+    assert "http_request_duration_seconds" not in response.text
+
+
+def test_serves_metrics_with_token(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    client.get("/api/health")
+    response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/health",status="200"}' in response.text
@@ -0,0 +1,71 @@
+"""
+Login token buckets: a burst of capacity takes, then one take per refill
+interval, with the wait until the next token reported on rejection.
+"""
+import asyncio
+import pytest
+from app import rate_limit
+from app.rate_limit import InMemoryRateLimitBackend
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def take(backend, key, capacity=3, refill_per_second=0.5):
+    return asyncio.run(backend.take(key, capacity, refill_per_second))
+
+
+def test_burst_then_rejected_with_retry_after(clock):
+    backend = InMemoryRateLimitBackend()
+    assert [take(backend, "ip:1") for _ in range(3)] == [(True, 0.0)] * 3
+    allowed, retry_after = take(backend, "ip:1")
+    assert not allowed and retry_after == pytest.approx(2.0)
+
+    clock.now += 1
+    allowed, retry_after = take(backend, "ip:1")
+    assert not allowed and retry_after == pytest.approx(1.0)
+
+
+def test_refills_at_rate_up_to_capacity(clock):
+    backend = InMemoryRateLimitBackend()
+    for _ in range(3):
+        take(backend, "ip:1")
+
+    clock.now += 2
+    assert take(backend, "ip:1") == (True, 0.0)
+    assert take(backend, "ip:1")[0] is False
+
+    # A long idle period refills only up to the burst size
+    clock.now += 3600
+    assert [take(backend, "ip:1")[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_buckets_are_independent(clock):
+    backend = InMemoryRateLimitBackend()
+    for _ in range(3):
+        take(backend, "ip:1")
+    assert take(backend, "ip:1")[0] is False
+    assert take(backend, "ip:2") == (True, 0.0)
+
+
+def test_least_recently_used_buckets_are_evicted(clock):
+    backend = InMemoryRateLimitBackend(max_keys=2)
+    for _ in range(3):
+        take(backend, "ip:1")
+    take(backend, "ip:2")
+    take(backend, "ip:3")
+    assert list(backend._buckets) == ["ip:2", "ip:3"]
+    # An evicted bucket starts full again
+    assert take(backend, "ip:1") == (True, 0.0)
@@ -0,0 +1,135 @@
+"""Slow-query shapes keep no values, and explain summaries expose the plan and counters."""
+import json
+from datetime import datetime
+from bson import ObjectId
+from app.slow_query_log import redact, shape_of, summarize_explain
+
+
+def test_redact_keeps_keys_operators_and_field_paths():
+    spec = {
+        "status": "reported",
+        "created_at": {"$lte": datetime(2024, 1, 1)},
+        "_id": ObjectId(),
+        "category": {"$in": ["electrical", "plumbing"]},
+        "$or": [{"is_public": True}, {"created_by": "s@x.com"}],
+        "search_text": {"$regex": "fan"},
+    }
+    assert redact(spec) == {
+        "status": "?",
+        "created_at": {"$lte": "?"},
+        "_id": "?",
+        "category": {"$in": "?"},
+        "$or": [{"is_public": "?"}, {"created_by": "?"}],
+        "search_text": {"$regex": "?"},
+    }
+    pipeline = [
+        {"$match": {"hostel": "Hostel A"}},
+        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+        {"$limit": 10},
+    ]
+    assert redact(pipeline) == [
+        {"$match": {"hostel": "?"}},
+        {"$group": {"_id": "$category", "count": {"$sum": "?"}}},
+        {"$limit": "?"},
+    ]
+
+
+def test_dollar_values_in_filters_are_redacted():
+    # User input such as a status filter or search term may start with "$"
+    assert redact({"field": "$userdata"}) == {"field": "?"}
+    assert redact({"filter": {"status": "$secret", "tags": {"$in": ["$a"]}}}) == {
+        "filter": {"status": "?", "tags": {"$in": "?"}}
+    }
+    assert redact([{"$match": {"created_by": "$someone"}}]) == [{"$match": {"created_by": "?"}}]
+    shape, _ = shape_of("issues", "find", {"filter": {"title": {"$regex": "$userdata"}}})
+    assert "userdata" not in shape
+
+
+def test_field_paths_kept_in_expressions():
+    assert redact({"$expr": {"$gt": ["$updated_at", "$created_at"]}, "status": "$x"}) == {
+        "$expr": {"$gt": ["$updated_at", "$created_at"]}, "status": "?"
+    }
+    assert redact([
+        {"$unwind": "$comments"},
+        {"$set": {"hours": {"$divide": [{"$subtract": ["$resolved_at", "$created_at"]}, 3600000]}}},
+        {"$project": {"hostel": 1, "label": {"$concat": ["$hostel", " / ", "$block"]}}},
+    ]) == [
+        {"$unwind": "$comments"},
+        {"$set": {"hours": {"$divide": [{"$subtract": ["$resolved_at", "$created_at"]}, "?"]}}},
+        {"$project": {"hostel": "?", "label": {"$concat": ["$hostel", "?", "$block"]}}},
+    ]
+
+
+def test_same_shape_for_different_values():
+    first = {"filter": {"status": "reported", "$or": [{"is_public": True}, {"created_by": "a@x.com"}]}}
+    second = {"filter": {"$or": [{"is_public": True}, {"created_by": "b@x.com"}], "status": "closed"}}
+    shape, shape_id = shape_of("issues", "find", first)
+    assert shape_of("issues", "find", second) == (shape, shape_id)
+    assert "a@x.com" not in shape and "reported" not in shape
+    json.loads(shape)
+
+    assert shape_of("issues", "count", first)[1] != shape_id
+    assert shape_of("announcements", "find", first)[1] != shape_id
+    assert shape_of("issues", "find", {"filter": {"category": "x"}})[1] != shape_id
+
+
+def test_summarize_find_explain():
+    explain = {
+        "queryPlanner": {"winningPlan": {
+            "stage": "LIMIT",
+            "inputStage": {
+                "stage": "FETCH",
+                "inputStage": {"stage": "IXSCAN", "indexName": "status_created_at_id"}
+            }
+        }},
+        "executionStats": {
+            "nReturned": 20,
+            "executionTimeMillis": 3,
+            "totalKeysExamined": 20,
+            "totalDocsExamined": 20
+        }
+    }
+    assert summarize_explain(explain) == {
+        "plan": "LIMIT > FETCH > IXSCAN(status_created_at_id)",
+        "collscan": False,
+        "in_memory_sort": False,
+        "docs_examined": 20,
+        "keys_examined": 20,
+        "n_returned": 20,
+        "examined_ratio": 1.0,
+        "execution_ms": 3
+    }
+
+
+def test_summarize_aggregate_explain_flags_collscan_and_sort():
+    # Aggregations nest the plan under their first stage; slot-based plans under queryPlan
+    explain = {"stages": [
+        {"$cursor": {
+            "queryPlanner": {"winningPlan": {"queryPlan": {
+                "stage": "SORT",
+                "inputStage": {"stage": "OR", "inputStages": [
+                    {"stage": "COLLSCAN"},
+                    {"stage": "IXSCAN", "indexName": "created_by_created_at_id"}
+                ]}
+            }}},
+            "executionStats": {"nReturned": 0, "totalKeysExamined": 0, "totalDocsExamined": 5000}
+        }},
+        {"$group": {}}
+    ]}
+    summary = summarize_explain(explain)
+    assert summary["plan"] == "SORT > OR[COLLSCAN, IXSCAN(created_by_created_at_id)]"
+    assert summary["collscan"] and summary["in_memory_sort"]
+    assert summary["examined_ratio"] == 5000
+    assert summary["execution_ms"] is None
+
+
+def test_sort_key_generator_is_not_an_in_memory_sort():
+    summary = summarize_explain({"queryPlanner": {"winningPlan": {
+        "stage": "SORT_KEY_GENERATOR", "inputStage": {"stage": "IXSCAN", "indexName": "created_at_id"}
+    }}})
+    assert not summary["in_memory_sort"] and summary["docs_examined"] == 0
+
+
+def test_summarize_without_plan():
+    summary = summarize_explain({"ok": 1})
+    assert summary["plan"] is None and not summary["collscan"] and not summary["in_memory_sort"]
@@ -0,0 +1,61 @@
+"""
+Revoking a user's tokens rejects every token issued before, including ones
+whose decoded claims are already cached, on this worker at once and on the
+others after their next refresh.
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app import auth
+from app.auth import create_access_token, get_token_payload
+from app.services import token_service
+from app.services.token_service import TokenService
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(token_service, "_token_versions", {})
+    auth.token_cache.clear()
+    yield
+    auth.token_cache.clear()
+
+
+def accepted(token):
+    try:
+        asyncio.run(get_token_payload(token))
+    except HTTPException as e:
+        assert e.status_code == 401
+        return False
+    return True
+
+
+def test_revoked_tokens_are_rejected_even_when_cached(db):
+    asyncio.run(db.users.insert_one({"email": "s@x.com", "role": "student"}))
+    old = create_access_token({"sub": "s@x.com"}, role="student")
+    other = create_access_token({"sub": "t@x.com"}, role="student")
+    assert accepted(old)
+
+    assert asyncio.run(TokenService.revoke_tokens("s@x.com")) == 1
+    assert not accepted(old)
+    assert accepted(other)
+    assert accepted(create_access_token({"sub": "s@x.com"}, role="admin", token_version=1))
+
+
+def test_refresh_picks_up_revocations_from_other_workers(db):
+    asyncio.run(db.users.insert_many([
+        {"email": "s@x.com", "token_version": 2},
+        {"email": "t@x.com", "token_version": 0},
+    ]))
+    token = create_access_token({"sub": "s@x.com"}, token_version=1)
+    assert accepted(token)
+
+    assert asyncio.run(TokenService.refresh()) == 1
+    assert TokenService.is_revoked("s@x.com", 1)
+    assert not TokenService.is_revoked("s@x.com", 2)
+    assert not TokenService.is_revoked("t@x.com", 0)
+    assert not accepted(token)
+
+
+def test_revoking_unknown_user(db):
+    assert asyncio.run(TokenService.revoke_tokens("nobody@x.com")) is None
+    assert token_service._token_versions == {}